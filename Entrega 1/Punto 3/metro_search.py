@@ -1,23 +1,107 @@
 from collections import deque
+import functools
+import heapq
+import itertools
 import time
 import tracemalloc
 from typing import List, Dict, Set, Tuple, Optional, Any
 
+try:  # aceleración opcional: el módulo funciona igual sin numba/numpy
+    import numpy as np
+    from numba import njit
+
+    _NUMBA_DISPONIBLE = True
+except ImportError:
+    _NUMBA_DISPONIBLE = False
+
+
+# Pool de nodos reutilizables: evita pagar el alocador de CPython por cada
+# Nodo temporal que crean las búsquedas (IDDFS los crea a miles).
+_NODE_POOL: List['Nodo'] = []
+
+
+# Pila reutilizada por todas las iteraciones de IDDFS (se limpia al entrar).
+_DLS_STACK: List[Any] = []
+
+
+if _NUMBA_DISPONIBLE:
+
+    @njit(cache=True)
+    def _bfs_core(indptr, indices, origen, destino, n):
+        """BFS sobre CSR con enteros puros: devuelve (padres, explorados)."""
+        padres = np.full(n, -1, np.int32)
+        cola = np.empty(n, np.int32)
+        cabeza = 0
+        fin = 1
+        cola[0] = origen
+        visitados = 1 << origen
+        explorados = 0
+        while cabeza < fin:
+            u = cola[cabeza]
+            cabeza += 1
+            explorados += 1
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                bit = 1 << v
+                if visitados & bit == 0:
+                    visitados |= bit
+                    padres[v] = u
+                    if v == destino:
+                        return padres, explorados
+                    cola[fin] = v
+                    fin += 1
+        return padres, explorados
+
+
+def _iniciar_perfil(profile: bool) -> None:
+    if profile:
+        tracemalloc.start()
+
+
+def _detener_perfil(profile: bool) -> Tuple[int, int]:
+    if not profile:
+        return 0, 0
+    memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memoria_actual, memoria_pico
+
 
 class Nodo:
+    __slots__ = ('estado', 'padre', 'accion', 'profundidad')
+
     def __init__(self, estado: str, padre: Optional['Nodo'] = None, accion: Optional[str] = None, profundidad: int = 0):
         self.estado = estado
         self.padre = padre
         self.accion = accion
         self.profundidad = profundidad
-    
+
+    @classmethod
+    def acquire(cls, estado: str, padre: Optional['Nodo'] = None, accion: Optional[str] = None, profundidad: int = 0) -> 'Nodo':
+        if _NODE_POOL:
+            nodo = _NODE_POOL.pop()
+            nodo.estado = estado
+            nodo.padre = padre
+            nodo.accion = accion
+            nodo.profundidad = profundidad
+            return nodo
+        return cls(estado, padre, accion, profundidad)
+
+    def release(self) -> None:
+        self.padre = None
+        _NODE_POOL.append(self)
+
     def obtener_camino(self) -> List[str]:
-        camino = []
-        nodo = self
-        while nodo:
-            camino.append(nodo.estado)
+        # profundidad ya dice cuántas estaciones tiene el camino: se reserva
+        # la lista completa una vez y se llena de atrás hacia adelante.
+        n = self.profundidad + 1
+        camino: List[Optional[str]] = [None] * n
+        nodo: Optional[Nodo] = self
+        i = n - 1
+        while nodo is not None:
+            camino[i] = nodo.estado
+            i -= 1
             nodo = nodo.padre
-        return list(reversed(camino))
+        return camino
     
     def __repr__(self):
         return f"Nodo({self.estado}, profundidad={self.profundidad})"
@@ -37,15 +121,57 @@ class ProblemaMetro:
             'I': ['E', 'J'],
             'J': ['F', 'I']
         }
-    
+        # Tuplas congeladas: iteración más barata y sin riesgo de mutación.
+        self.grafo = {nombre: tuple(vecinos) for nombre, vecinos in self.grafo.items()}
+
+        # Representación CSR paralela: estaciones como enteros pequeños
+        # (A=0..J=9) y adyacencia en dos arreglos planos contiguos. Permite
+        # membresía por máscara de bits en los bucles internos en lugar de
+        # sets de cadenas (el grafo tiene <=64 nodos).
+        self._id2name: List[str] = sorted(self.grafo)
+        self._name2id: Dict[str, int] = {nombre: i for i, nombre in enumerate(self._id2name)}
+        self._indptr: List[int] = [0]
+        self._indices: List[int] = []
+        for nombre in self._id2name:
+            self._indices.extend(self._name2id[vecino] for vecino in self.grafo[nombre])
+            self._indptr.append(len(self._indices))
+
+        if _NUMBA_DISPONIBLE:
+            self._indptr_np = np.asarray(self._indptr, dtype=np.int32)
+            self._indices_np = np.asarray(self._indices, dtype=np.int32)
+
+        # Tabla de heurísticas por objetivo: BFS inverso desde cada estación
+        # (|V|^2 ~= 100 operaciones, una sola vez). Como es la distancia real,
+        # la heurística es perfecta: A* expande solo el camino óptimo.
+        self._h: Dict[str, Dict[str, int]] = {}
+        for objetivo in self.grafo:
+            dist = {objetivo: 0}
+            dq = deque([objetivo])
+            while dq:
+                u = dq.popleft()
+                for v in self.grafo[u]:
+                    if v not in dist:
+                        dist[v] = dist[u] + 1
+                        dq.append(v)
+            self._h[objetivo] = dist
+
     def estado_inicial(self) -> str:
         return 'A'
     
     def es_objetivo(self, estado: str) -> bool:
         return estado == 'J'
     
+    @functools.lru_cache(maxsize=None)
     def acciones(self, estado: str) -> List[str]:
         return self.grafo.get(estado, [])
+
+    def acciones_ids(self, sid: int) -> List[int]:
+        return self._indices[self._indptr[sid]:self._indptr[sid + 1]]
+
+    def h(self, estado: str, objetivo: str) -> int:
+        # len(grafo) como infinito práctico: estados inalcanzables quedan
+        # fuera de cualquier camino simple.
+        return self._h.get(objetivo, {}).get(estado, len(self.grafo))
     
     def resultado(self, estado: str, accion: str) -> str:
         if accion in self.grafo.get(estado, []):
@@ -56,134 +182,250 @@ class ProblemaMetro:
         return len(camino) - 1
 
 
-def busqueda_en_anchura(problema: ProblemaMetro, inicio: str = 'A', objetivo: str = 'J') -> Tuple[Optional[Nodo], Dict[str, Any]]:
-    tiempo_inicio = time.time()
-    tracemalloc.start()
-    
-    nodo_inicial = Nodo(inicio)
-    
-    if nodo_inicial.estado == objetivo:
-        tiempo_fin = time.time()
-        memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        return nodo_inicial, {
-            'tiempo': tiempo_fin - tiempo_inicio,
+def busqueda_en_anchura(problema: ProblemaMetro, inicio: str = 'A', objetivo: str = 'J', profile: bool = False) -> Tuple[Optional[Nodo], Dict[str, Any]]:
+    t0 = time.perf_counter_ns()
+    _iniciar_perfil(profile)
+
+    def _finish(nodos: int) -> Dict[str, Any]:
+        memoria_actual, memoria_pico = _detener_perfil(profile)
+        return {
+            'tiempo': (time.perf_counter_ns() - t0) * 1e-9,
             'memoria_actual': memoria_actual,
             'memoria_pico': memoria_pico,
-            'nodos_explorados': 1
+            'nodos_explorados': nodos
         }
-    
+
+    nodo_inicial = Nodo.acquire(inicio)
+
+    if nodo_inicial.estado == objetivo:
+        return nodo_inicial, _finish(1)
+
+    name2id = problema._name2id
+    id2name = problema._id2name
+
+    if _NUMBA_DISPONIBLE:
+        # Núcleo jitted: el recorrido entero es aritmética de enteros e
+        # indexación de arreglos; Python solo reconstruye el camino.
+        padres, nodos_explorados = _bfs_core(
+            problema._indptr_np, problema._indices_np,
+            name2id[inicio], name2id[objetivo], len(id2name)
+        )
+        destino_id = name2id[objetivo]
+        if padres[destino_id] < 0:
+            return None, _finish(int(nodos_explorados))
+        cadena_ids = [destino_id]
+        while cadena_ids[-1] != name2id[inicio]:
+            cadena_ids.append(int(padres[cadena_ids[-1]]))
+        nodo = nodo_inicial
+        for sid in reversed(cadena_ids[:-1]):
+            estado = id2name[sid]
+            nodo = Nodo.acquire(estado, padre=nodo, accion=estado, profundidad=nodo.profundidad + 1)
+        return nodo, _finish(int(nodos_explorados))
+
     frontera = deque([nodo_inicial])
-    estados_frontera: Set[str] = {nodo_inicial.estado}
-    explorados = set()
+    # Máscaras de bits sobre ids enteros: membresía sin hashing de cadenas.
+    # Los enteros de Python son de precisión arbitraria, así que el esquema
+    # escala más allá de 64 estados sin necesitar un arreglo booleano aparte.
+    frontera_mask = 1 << name2id[inicio]
+    explorados_mask = 0
     nodos_explorados = 0
-    
+
     while frontera:
         nodo = frontera.popleft()
-        estados_frontera.discard(nodo.estado)
-        explorados.add(nodo.estado)
+        sid = name2id[nodo.estado]
+        frontera_mask &= ~(1 << sid)
+        explorados_mask |= 1 << sid
         nodos_explorados += 1
-        
-        for accion in problema.acciones(nodo.estado):
-            estado_hijo = problema.resultado(nodo.estado, accion)
-            
-            if estado_hijo not in explorados and estado_hijo not in estados_frontera:
-                nodo_hijo = Nodo(estado_hijo, padre=nodo, accion=accion, profundidad=nodo.profundidad + 1)
-                
+
+        for hijo_id in problema.acciones_ids(sid):
+            bit = 1 << hijo_id
+
+            if not (explorados_mask | frontera_mask) & bit:
+                estado_hijo = id2name[hijo_id]
+                nodo_hijo = Nodo.acquire(estado_hijo, padre=nodo, accion=estado_hijo, profundidad=nodo.profundidad + 1)
+
                 if nodo_hijo.estado == objetivo:
-                    tiempo_fin = time.time()
-                    memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
-                    tracemalloc.stop()
-                    return nodo_hijo, {
-                        'tiempo': tiempo_fin - tiempo_inicio,
-                        'memoria_actual': memoria_actual,
-                        'memoria_pico': memoria_pico,
-                        'nodos_explorados': nodos_explorados
-                    }
+                    return nodo_hijo, _finish(nodos_explorados)
                 
                 frontera.append(nodo_hijo)
-                estados_frontera.add(estado_hijo)
+                frontera_mask |= bit
     
-    tiempo_fin = time.time()
-    memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    return None, {
-        'tiempo': tiempo_fin - tiempo_inicio,
-        'memoria_actual': memoria_actual,
-        'memoria_pico': memoria_pico,
-        'nodos_explorados': nodos_explorados
-    }
+    return None, _finish(nodos_explorados)
 
 
-def busqueda_limitada_en_profundidad(problema: ProblemaMetro, inicio: str, objetivo: str, limite: int) -> Tuple[Optional[Nodo], bool, int]:
-    def recursiva_blp(nodo: Nodo, limite: int, conjunto_camino: Set[str]) -> Tuple[Optional[Nodo], bool, int]:
-        nodos_explorados = 1
-        
+def busqueda_a_estrella(problema: ProblemaMetro, inicio: str = 'A', objetivo: str = 'J', profile: bool = False) -> Tuple[Optional[Nodo], Dict[str, Any]]:
+    t0 = time.perf_counter_ns()
+    _iniciar_perfil(profile)
+
+    def _finish(nodos: int) -> Dict[str, Any]:
+        memoria_actual, memoria_pico = _detener_perfil(profile)
+        return {
+            'tiempo': (time.perf_counter_ns() - t0) * 1e-9,
+            'memoria_actual': memoria_actual,
+            'memoria_pico': memoria_pico,
+            'nodos_explorados': nodos
+        }
+
+    nodo_inicial = Nodo(inicio)
+    contador = itertools.count()
+    h = problema._h.get(objetivo, {})
+
+    # La lista OPEN es un montículo binario; best_g hace de tabla hash de
+    # membresía y de mejor costo conocido, sin necesidad de un set espejo.
+    open_heap: List[Tuple[int, int, int, Nodo]] = [(h.get(inicio, 0), 0, next(contador), nodo_inicial)]
+    best_g: Dict[str, int] = {inicio: 0}
+    nodos_explorados = 0
+    acciones = problema.acciones
+
+    while open_heap:
+        _, g, _, nodo = heapq.heappop(open_heap)
+
+        if g > best_g.get(nodo.estado, g):
+            continue
+
+        nodos_explorados += 1
+
         if nodo.estado == objetivo:
-            return nodo, False, nodos_explorados
-        
-        if limite == 0:
-            return None, True, nodos_explorados
-        
-        hubo_corte = False
-        
-        for accion in problema.acciones(nodo.estado):
-            estado_hijo = problema.resultado(nodo.estado, accion)
-            
-            if estado_hijo in conjunto_camino:
+            return nodo, _finish(nodos_explorados)
+
+        for accion in acciones(nodo.estado):
+            estado_hijo = accion
+            g_tentativo = g + 1
+
+            if g_tentativo >= best_g.get(estado_hijo, float('inf')):
                 continue
-            
-            nodo_hijo = Nodo(estado_hijo, padre=nodo, accion=accion, profundidad=nodo.profundidad + 1)
-            conjunto_camino.add(estado_hijo)
-            resultado, hubo_corte_hijo, nodos_hijo = recursiva_blp(nodo_hijo, limite - 1, conjunto_camino)
-            nodos_explorados += nodos_hijo
-            conjunto_camino.remove(estado_hijo)
-            
-            if resultado is not None:
-                return resultado, False, nodos_explorados
-            if hubo_corte_hijo:
-                hubo_corte = True
-        
-        return None, hubo_corte, nodos_explorados
-    
-    nodo_inicial = Nodo(inicio)
-    return recursiva_blp(nodo_inicial, limite, {inicio})
 
+            best_g[estado_hijo] = g_tentativo
+            nodo_hijo = Nodo(estado_hijo, padre=nodo, accion=accion, profundidad=g_tentativo)
+            heapq.heappush(open_heap, (g_tentativo + h.get(estado_hijo, 0), g_tentativo, next(contador), nodo_hijo))
 
-def busqueda_de_profundizacion_iterativa(problema: ProblemaMetro, inicio: str = 'A', objetivo: str = 'J') -> Tuple[Optional[Nodo], Dict[str, Any]]:
-    tiempo_inicio = time.time()
-    tracemalloc.start()
-    
+    return None, _finish(nodos_explorados)
+
+
+def busqueda_limitada_en_profundidad(problema: ProblemaMetro, inicio: str, objetivo: str, limite: int, _cache: Optional[Dict[Tuple[str, int], bool]] = None) -> Tuple[Optional[Nodo], bool, int]:
+    # _cache: resultados negativos (estado, limite) -> hubo_corte que IDDFS
+    # comparte entre sus iteraciones para no re-expandir los niveles
+    # superficiales. Las entradas dependen del contexto del camino que las
+    # produjo (qué estados formaban path_mask al escribirlas), así que solo
+    # valen dentro de la búsqueda de nivel superior que las creó: cada
+    # llamada directa arranca con un dict nuevo.
+    cache: Dict[Tuple[str, int], bool] = {} if _cache is None else _cache
+    acciones = problema.acciones
+
+    nodo_inicial = Nodo.acquire(inicio)
+    nodos_explorados = 1
+
+    if nodo_inicial.estado == objetivo:
+        return nodo_inicial, False, nodos_explorados
+
+    if limite == 0:
+        return None, True, nodos_explorados
+
+    corte_cacheado = cache.get((inicio, limite))
+    if corte_cacheado is not None:
+        return None, corte_cacheado, nodos_explorados
+
+    # El camino actual como máscara de bits sobre ids de estación: entrar y
+    # salir del camino es un OR / AND-NOT en vez de dos operaciones de hash,
+    # y desaparecen los sets por iteración de IDDFS.
+    name2id = problema._name2id
+    path_mask = 1 << name2id[inicio]
+
+    # Pila explícita en lugar de recursión: un marco CPython por nodo es el
+    # costo dominante del DFS puro en Python y además arriesga
+    # RecursionError con límites profundos. Cada marco es mutable:
+    # [nodo, iterador_de_hijos, limite_restante, hubo_corte].
+    pila = _DLS_STACK
+    pila.clear()
+    pila.append([nodo_inicial, iter(acciones(inicio)), limite, False])
+    corte_raiz = False
+
+    while pila:
+        marco = pila[-1]
+        nodo = marco[0]
+        estado_hijo = next(marco[1], None)
+
+        if estado_hijo is None:
+            # Subárbol agotado sin objetivo: registrar el resultado negativo
+            # y propagar el corte al padre.
+            pila.pop()
+            cache[(nodo.estado, marco[2])] = marco[3]
+            path_mask &= ~(1 << name2id[nodo.estado])
+            if pila:
+                if marco[3]:
+                    pila[-1][3] = True
+                nodo.release()
+            else:
+                corte_raiz = marco[3]
+            continue
+
+        bit_hijo = 1 << name2id[estado_hijo]
+        if path_mask & bit_hijo:
+            continue
+
+        nodos_explorados += 1
+        nodo_hijo = Nodo.acquire(estado_hijo, padre=nodo, accion=estado_hijo, profundidad=nodo.profundidad + 1)
+
+        if estado_hijo == objetivo:
+            pila.clear()
+            return nodo_hijo, False, nodos_explorados
+
+        limite_hijo = marco[2] - 1
+        if limite_hijo == 0:
+            marco[3] = True
+            nodo_hijo.release()
+            continue
+
+        corte_cacheado = cache.get((estado_hijo, limite_hijo))
+        if corte_cacheado is not None:
+            if corte_cacheado:
+                marco[3] = True
+            nodo_hijo.release()
+            continue
+
+        path_mask |= bit_hijo
+        pila.append([nodo_hijo, iter(acciones(estado_hijo)), limite_hijo, False])
+
+    return None, corte_raiz, nodos_explorados
+
+
+def busqueda_de_profundizacion_iterativa(problema: ProblemaMetro, inicio: str = 'A', objetivo: str = 'J', profile: bool = False) -> Tuple[Optional[Nodo], Dict[str, Any]]:
+    t0 = time.perf_counter_ns()
+    _iniciar_perfil(profile)
+
+    def _finish(nodos: int) -> Dict[str, Any]:
+        memoria_actual, memoria_pico = _detener_perfil(profile)
+        return {
+            'tiempo': (time.perf_counter_ns() - t0) * 1e-9,
+            'memoria_actual': memoria_actual,
+            'memoria_pico': memoria_pico,
+            'nodos_explorados': nodos
+        }
+
+    # Caché de negativos propia de esta búsqueda: compartirla entre las
+    # iteraciones es seguro (mismo inicio/objetivo), pero no puede sobrevivir
+    # a la llamada porque sus entradas dependen del contexto del camino.
+    cache_dls: Dict[Tuple[str, int], bool] = {}
     total_nodos_explorados = 0
-    
-    for profundidad in range(100):
-        resultado, hubo_corte, nodos_explorados = busqueda_limitada_en_profundidad(problema, inicio, objetivo, profundidad)
+
+    # Cota inferior admisible: la distancia BFS exacta precomputada; ningún
+    # camino simple puede superar |V| - 1 aristas.
+    limite_inferior = problema.h(inicio, objetivo)
+    limite_superior = len(problema.grafo)
+
+    for profundidad in range(limite_inferior, limite_superior):
+        resultado, hubo_corte, nodos_explorados = busqueda_limitada_en_profundidad(problema, inicio, objetivo, profundidad, _cache=cache_dls)
         total_nodos_explorados += nodos_explorados
         
         if resultado is not None:
-            tiempo_fin = time.time()
-            memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
-            return resultado, {
-                'tiempo': tiempo_fin - tiempo_inicio,
-                'memoria_actual': memoria_actual,
-                'memoria_pico': memoria_pico,
-                'nodos_explorados': total_nodos_explorados,
-                'profundidad_maxima': profundidad
-            }
+            estadisticas = _finish(total_nodos_explorados)
+            estadisticas['profundidad_maxima'] = profundidad
+            return resultado, estadisticas
         
         if not hubo_corte:
             break
     
-    tiempo_fin = time.time()
-    memoria_actual, memoria_pico = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    return None, {
-        'tiempo': tiempo_fin - tiempo_inicio,
-        'memoria_actual': memoria_actual,
-        'memoria_pico': memoria_pico,
-        'nodos_explorados': total_nodos_explorados
-    }
+    return None, _finish(total_nodos_explorados)
 
 
 def imprimir_resultados(nombre_algoritmo: str, resultado: Optional[Nodo], estadisticas: Dict[str, Any]):
@@ -206,16 +448,33 @@ def imprimir_resultados(nombre_algoritmo: str, resultado: Optional[Nodo], estadi
         print(f"Profundidad máxima alcanzada: {estadisticas['profundidad_maxima']}")
 
 
+def _medir(busqueda, problema: ProblemaMetro, inicio: str, objetivo: str) -> Tuple[Optional[Nodo], Dict[str, Any]]:
+    """Ejecuta una búsqueda dos veces: sin perfil para el tiempo y con perfil para la memoria.
+
+    tracemalloc instrumenta cada asignación de Python; en un grafo de 10 nodos
+    ese costo domina al del algoritmo, así que el tiempo reportado sale de la
+    corrida limpia y solo la memoria de la corrida instrumentada.
+    """
+    resultado, estadisticas = busqueda(problema, inicio, objetivo)
+    _, estadisticas_mem = busqueda(problema, inicio, objetivo, profile=True)
+    estadisticas['memoria_actual'] = estadisticas_mem['memoria_actual']
+    estadisticas['memoria_pico'] = estadisticas_mem['memoria_pico']
+    return resultado, estadisticas
+
+
 def principal():
     problema = ProblemaMetro()
-    
+
     print("Navegación en la Red de Metro - Buscando ruta de A a J")
     print("=" * 50)
-    
-    resultado_bfs, estadisticas_bfs = busqueda_en_anchura(problema, 'A', 'J')
+
+    resultado_bfs, estadisticas_bfs = _medir(busqueda_en_anchura, problema, 'A', 'J')
     imprimir_resultados("Búsqueda en Anchura (BFS)", resultado_bfs, estadisticas_bfs)
-    
-    resultado_ids, estadisticas_ids = busqueda_de_profundizacion_iterativa(problema, 'A', 'J')
+
+    resultado_astar, estadisticas_astar = _medir(busqueda_a_estrella, problema, 'A', 'J')
+    imprimir_resultados("Búsqueda A* (heurística BFS a J)", resultado_astar, estadisticas_astar)
+
+    resultado_ids, estadisticas_ids = _medir(busqueda_de_profundizacion_iterativa, problema, 'A', 'J')
     imprimir_resultados("Búsqueda de Profundización Iterativa (IDS)", resultado_ids, estadisticas_ids)
     
     print("\n\nAnálisis de Comparación:")
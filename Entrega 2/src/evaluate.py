@@ -18,10 +18,15 @@ import os
 from typing import Dict, List, Optional, Tuple
 
 import joblib
+import matplotlib
+
+matplotlib.use("Agg")  # backend sin GUI: necesario en workers de joblib
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from joblib import Parallel, delayed
 from sklearn.metrics import (
     ConfusionMatrixDisplay,
     accuracy_score,
@@ -48,24 +53,51 @@ def load_data(path: str) -> pd.DataFrame:
     return df
 
 
+# Extensiones de modelos serializados, en orden de preferencia de recorte.
+_MODEL_SUFFIXES = (".joblib.lz4", ".pkl")
+
+
 def list_model_paths(models_dir: str) -> List[str]:
-    return [
-        os.path.join(models_dir, f)
-        for f in os.listdir(models_dir)
-        if f.endswith(".pkl")
-    ]
+    # scandir entrega DirEntry con metadatos ya cargados: filtra archivos
+    # de modelo y descarta directorios en una sola pasada de syscalls.
+    with os.scandir(models_dir) as it:
+        return [e.path for e in it if e.is_file() and e.name.endswith(_MODEL_SUFFIXES)]
 
 
-def predict_scores(model, X_test: pd.DataFrame) -> Tuple[np.ndarray, Optional[np.ndarray]]:
-    """Devuelve (y_pred, y_score) siendo y_score probabilidades o decision_function si existe."""
-    y_pred = model.predict(X_test)
-    y_score: Optional[np.ndarray] = None
+def _model_name(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in _MODEL_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def predict_scores(
+    model, X_test: pd.DataFrame, chunk_size: int = 8192
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Devuelve (y_pred, y_score) siendo y_score probabilidades o decision_function si existe.
+
+    Con predict_proba disponible se atraviesa la pipeline UNA sola vez
+    (predict() la recorrería de nuevo) y se predice por bloques para acotar
+    la memoria pico de la matriz densa tras el one-hot.
+    """
     if hasattr(model, "predict_proba"):
         try:
-            y_score = model.predict_proba(X_test)[:, 1]
+            y_score = np.concatenate(
+                [
+                    model.predict_proba(X_test.iloc[i : i + chunk_size])[:, 1]
+                    for i in range(0, len(X_test), chunk_size)
+                ]
+            )
+            # binaria con clases {0, 1}: el umbral 0.5 reproduce predict()
+            y_pred = (y_score >= 0.5).astype(np.int8)
+            return y_pred, y_score
         except Exception:
-            y_score = None
-    if y_score is None and hasattr(model, "decision_function"):
+            pass
+
+    y_pred = model.predict(X_test)
+    y_score: Optional[np.ndarray] = None
+    if hasattr(model, "decision_function"):
         try:
             y_score = model.decision_function(X_test)
         except Exception:
@@ -73,19 +105,36 @@ def predict_scores(model, X_test: pd.DataFrame) -> Tuple[np.ndarray, Optional[np
     return y_pred, y_score
 
 
+# Figuras reutilizadas por tipo de gráfico: construir una figura matplotlib
+# (backend, font manager, locators) es caro y se paga N modelos x 3 veces.
+_FIGS: Dict[str, tuple] = {}
+
+
+def _reuse_fig_ax(kind: str, figsize: tuple):
+    if kind not in _FIGS:
+        _FIGS[kind] = plt.subplots(figsize=figsize)
+    fig, ax = _FIGS[kind]
+    # ax.clear() no elimina ejes extra añadidos a la figura por el render
+    # anterior (p. ej. la colorbar de ConfusionMatrixDisplay); sin esto se
+    # apilan una por llamada y encogen el gráfico principal.
+    for extra_ax in [a for a in fig.axes if a is not ax]:
+        extra_ax.remove()
+    ax.clear()
+    return fig, ax
+
+
 def save_confusion_matrix(y_true, y_pred, out_path: str, title: str) -> None:
-    fig, ax = plt.subplots(figsize=(4, 4))
+    fig, ax = _reuse_fig_ax("cm", (4, 4))
     disp = ConfusionMatrixDisplay.from_predictions(y_true, y_pred, cmap="Blues", ax=ax)
     ax.set_title(title)
     fig.tight_layout()
     fig.savefig(out_path, dpi=150)
-    plt.close(fig)
 
 
 def save_roc_curve(y_true, y_score, out_path: str, title: str) -> float:
     fpr, tpr, _ = roc_curve(y_true, y_score)
     auc = roc_auc_score(y_true, y_score)
-    fig, ax = plt.subplots(figsize=(5, 4))
+    fig, ax = _reuse_fig_ax("roc", (5, 4))
     ax.plot(fpr, tpr, label=f"ROC AUC = {auc:.3f}")
     ax.plot([0, 1], [0, 1], linestyle="--", color="gray")
     ax.set_xlabel("False Positive Rate")
@@ -93,27 +142,25 @@ def save_roc_curve(y_true, y_score, out_path: str, title: str) -> float:
     ax.set_title(title)
     ax.legend(loc="lower right")
     fig.tight_layout()
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    fig.savefig(out_path, dpi=100)
     return float(auc)
 
 
 def save_pr_curve(y_true, y_score, out_path: str, title: str) -> float:
     precision, recall, _ = precision_recall_curve(y_true, y_score)
     ap = average_precision_score(y_true, y_score)
-    fig, ax = plt.subplots(figsize=(5, 4))
+    fig, ax = _reuse_fig_ax("pr", (5, 4))
     ax.plot(recall, precision, label=f"AP = {ap:.3f}")
     ax.set_xlabel("Recall")
     ax.set_ylabel("Precision")
     ax.set_title(title)
     ax.legend(loc="lower left")
     fig.tight_layout()
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    fig.savefig(out_path, dpi=100)
     return float(ap)
 
 
-def try_save_feature_importances(model, X_test: pd.DataFrame, out_csv: str) -> Optional[str]:
+def try_save_feature_importances(model, out_csv: str) -> Optional[str]:
     """Extrae importancias si el estimador final las dispone y guarda CSV.
 
     Retorna la ruta si se guardó o None si no aplica.
@@ -122,16 +169,14 @@ def try_save_feature_importances(model, X_test: pd.DataFrame, out_csv: str) -> O
         if not hasattr(model, "named_steps"):
             return None
         est = model.named_steps.get("clf")
+        if est is None or not hasattr(est, "feature_importances_"):
+            return None
         preproc = model.named_steps.get("preprocessor")
         feat_eng = model.named_steps.get("feat_eng")
-        if est is None or preproc is None or feat_eng is None:
+        if preproc is None or feat_eng is None:
             return None
-        if not hasattr(est, "feature_importances_"):
-            return None
-        # obtener columnas tras ingeniería
-        X_eng = feat_eng.transform(X_test.copy())
-        input_cols = list(X_eng.columns)
-        feat_names = get_output_feature_names(preproc, input_cols)
+        # columnas tras ingeniería: fijadas en fit(), sin re-transformar
+        feat_names = get_output_feature_names(preproc, feat_eng.columns_)
         importances = est.feature_importances_
         if len(importances) != len(feat_names):
             feat_names = [f"f{i}" for i in range(len(importances))]
@@ -145,10 +190,66 @@ def try_save_feature_importances(model, X_test: pd.DataFrame, out_csv: str) -> O
         return None
 
 
+def evaluate_one(path: str, X_test: pd.DataFrame, y_test, out_dir: str) -> Tuple[str, Dict[str, float]]:
+    """Evalúa un único modelo .pkl y devuelve (nombre, métricas).
+
+    Es independiente por modelo, lo que permite repartir los modelos entre
+    procesos con joblib.Parallel en main().
+    """
+    name = _model_name(path)
+    logger.info(f"Evaluando modelo {name}...")
+    with timer(f"eval_{name}"):
+        # mmap: los arreglos del estimador (árboles RF, pesos MLP) se
+        # comparten vía page cache entre workers en lugar de copiarse.
+        # No aplica a archivos comprimidos (joblib lo ignoraría con aviso).
+        mmap = None if path.endswith(".lz4") else "r"
+        model = joblib.load(path, mmap_mode=mmap)
+        y_pred, y_score = predict_scores(model, X_test)
+
+    acc = accuracy_score(y_test, y_pred)
+    p_macro = precision_score(y_test, y_pred, average="macro", zero_division=0)
+    r_macro = recall_score(y_test, y_pred, average="macro", zero_division=0)
+    f1_macro = f1_score(y_test, y_pred, average="macro", zero_division=0)
+    p_weighted = precision_score(y_test, y_pred, average="weighted", zero_division=0)
+    r_weighted = recall_score(y_test, y_pred, average="weighted", zero_division=0)
+    f1_weighted = f1_score(y_test, y_pred, average="weighted", zero_division=0)
+    roc_auc = None
+    ap_score = None
+
+    # figuras
+    cm_path = os.path.join(out_dir, "figures", f"confusion_matrix_{name}.png")
+    save_confusion_matrix(y_test, y_pred, cm_path, f"Matriz de Confusión - {name}")
+
+    if y_score is not None:
+        roc_path = os.path.join(out_dir, "figures", f"roc_curve_{name}.png")
+        pr_path = os.path.join(out_dir, "figures", f"pr_curve_{name}.png")
+        roc_auc = save_roc_curve(y_test, y_score, roc_path, f"ROC - {name}")
+        ap_score = save_pr_curve(y_test, y_score, pr_path, f"Precision-Recall - {name}")
+
+    # importancias
+    imp_csv = os.path.join(out_dir, "metrics", f"feature_importances_{name}.csv")
+    imp_saved = try_save_feature_importances(model, imp_csv)
+
+    metrics = {
+        "accuracy": float(acc),
+        "precision_macro": float(p_macro),
+        "recall_macro": float(r_macro),
+        "f1_macro": float(f1_macro),
+        "precision_weighted": float(p_weighted),
+        "recall_weighted": float(r_weighted),
+        "f1_weighted": float(f1_weighted),
+        "roc_auc": float(roc_auc) if roc_auc is not None else None,
+        "average_precision": float(ap_score) if ap_score is not None else None,
+        "confusion_matrix_path": cm_path,
+        "feature_importances_csv": imp_saved,
+    }
+    return name, metrics
+
+
 def main():
     parser = argparse.ArgumentParser(description="Evalúa modelos entrenados para Titanic.")
     parser.add_argument("--data", required=True, help="Ruta al CSV con 'Survived'.")
-    parser.add_argument("--models_dir", default="models", help="Directorio con archivos .pkl")
+    parser.add_argument("--models_dir", default="models", help="Directorio con modelos serializados (.joblib.lz4 o .pkl)")
     parser.add_argument("--out_dir", default="reports", help="Directorio de salida para reportes")
     args = parser.parse_args()
 
@@ -167,54 +268,15 @@ def main():
 
     model_paths = list_model_paths(args.models_dir)
     if not model_paths:
-        raise FileNotFoundError(f"No se encontraron modelos .pkl en {args.models_dir}")
-
-    summary: Dict[str, Dict[str, float]] = {}
-
-    for path in model_paths:
-        name = os.path.splitext(os.path.basename(path))[0]
-        logger.info(f"Evaluando modelo {name}...")
-        with timer(f"eval_{name}"):
-            model = joblib.load(path)
-            y_pred, y_score = predict_scores(model, X_test)
-
-        acc = accuracy_score(y_test, y_pred)
-        p_macro = precision_score(y_test, y_pred, average="macro", zero_division=0)
-        r_macro = recall_score(y_test, y_pred, average="macro", zero_division=0)
-        f1_macro = f1_score(y_test, y_pred, average="macro", zero_division=0)
-        p_weighted = precision_score(y_test, y_pred, average="weighted", zero_division=0)
-        r_weighted = recall_score(y_test, y_pred, average="weighted", zero_division=0)
-        f1_weighted = f1_score(y_test, y_pred, average="weighted", zero_division=0)
-        roc_auc = None
-        ap_score = None
-
-        # figuras
-        cm_path = os.path.join(args.out_dir, "figures", f"confusion_matrix_{name}.png")
-        save_confusion_matrix(y_test, y_pred, cm_path, f"Matriz de Confusión - {name}")
-
-        if y_score is not None:
-            roc_path = os.path.join(args.out_dir, "figures", f"roc_curve_{name}.png")
-            pr_path = os.path.join(args.out_dir, "figures", f"pr_curve_{name}.png")
-            roc_auc = save_roc_curve(y_test, y_score, roc_path, f"ROC - {name}")
-            ap_score = save_pr_curve(y_test, y_score, pr_path, f"Precision-Recall - {name}")
-
-        # importancias
-        imp_csv = os.path.join(args.out_dir, "metrics", f"feature_importances_{name}.csv")
-        imp_saved = try_save_feature_importances(model, X_test, imp_csv)
-
-        summary[name] = {
-            "accuracy": float(acc),
-            "precision_macro": float(p_macro),
-            "recall_macro": float(r_macro),
-            "f1_macro": float(f1_macro),
-            "precision_weighted": float(p_weighted),
-            "recall_weighted": float(r_weighted),
-            "f1_weighted": float(f1_weighted),
-            "roc_auc": float(roc_auc) if roc_auc is not None else None,
-            "average_precision": float(ap_score) if ap_score is not None else None,
-            "confusion_matrix_path": cm_path,
-            "feature_importances_csv": imp_saved,
-        }
+        raise FileNotFoundError(f"No se encontraron modelos serializados en {args.models_dir}")
+
+    # Cada modelo es independiente: cargar, predecir y graficar en paralelo.
+    # n_jobs=1 dentro de los workers lo gestiona loky, evitando sobresuscribir
+    # a los estimadores entrenados con n_jobs=-1.
+    results = Parallel(n_jobs=-1, backend="loky")(
+        delayed(evaluate_one)(path, X_test, y_test, args.out_dir) for path in model_paths
+    )
+    summary: Dict[str, Dict[str, float]] = dict(results)
 
     # guardar resumen
     summary_path = os.path.join(args.out_dir, "metrics", "metrics_summary.json")
@@ -8,9 +8,11 @@ Provee:
 """
 from __future__ import annotations
 
+import os
 import re
 from typing import List, Optional
 
+import joblib
 import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
@@ -27,6 +29,43 @@ TEXT_COLS = ["Name", "Ticket", "Cabin"]
 ENGINEERED_NUMERIC = ["FamilySize", "IsAlone"]
 ENGINEERED_CATEGORICAL = ["Title", "Deck", "TicketPrefix"]
 
+# Patrones y mapeo de títulos precompilados una sola vez a nivel de módulo
+# (compilarlos o reconstruir el dict por fila es costo puro en .apply).
+_TITLE_RE = re.compile(r",\s*([^.]*)\.")
+_WS_RE = re.compile(r"\s+")
+# Primer bloque (separado por espacios) que contenga algún carácter no
+# numérico. [^\d\s] en vez de \D porque \D también acepta el espacio, lo que
+# fusionaría bloques puramente numéricos ("123 456" debe dar NONE).
+_TICKET_PREFIX_RE = re.compile(r"(\S*[^\d\s]\S*)")
+_TITLE_MAP = {
+    "Mlle": "Miss",
+    "Ms": "Miss",
+    "Mme": "Mrs",
+    "Lady": "Rare",
+    "Countess": "Rare",
+    "Capt": "Rare",
+    "Col": "Rare",
+    "Don": "Rare",
+    "Dr": "Rare",
+    "Major": "Rare",
+    "Rev": "Rare",
+    "Sir": "Rare",
+    "Jonkheer": "Rare",
+    "Dona": "Rare",
+}
+# Mapeo completo título crudo -> clase final; lo que no aparezca es 'Rare'.
+_TITLE_FINAL_MAP = {t: t for t in ("Mr", "Mrs", "Miss", "Master")}
+_TITLE_FINAL_MAP.update(_TITLE_MAP)
+
+# Memoria compartida por defecto para todas las pipelines: como los pasos de
+# preprocesamiento son idénticos entre los 4 modelos, un mismo fold ajustado
+# para uno se reutiliza para los demás (la clave de joblib.Memory depende del
+# paso y sus datos, no del modelo final).
+_DEFAULT_PIPE_MEMORY = joblib.Memory(
+    location=os.environ.get("SKLEARN_PIPE_CACHE", os.path.join("reports", ".pipe_cache")),
+    verbose=0,
+)
+
 
 class TitanicFeatureEngineer(BaseEstimator, TransformerMixin):
     """Crea variables derivadas del dataset Titanic.
@@ -43,31 +82,27 @@ class TitanicFeatureEngineer(BaseEstimator, TransformerMixin):
         self.columns_: Optional[List[str]] = None
 
     def fit(self, X: pd.DataFrame, y=None):  # noqa: N803 (sklearn signature)
+        # El orden de columnas de salida es determinista dado X: fijarlo aquí
+        # permite a los consumidores leer columns_ sin re-ejecutar transform.
+        cols = (
+            BASE_NUMERIC
+            + BASE_CATEGORICAL
+            + ENGINEERED_NUMERIC
+            + ENGINEERED_CATEGORICAL
+        )
+        engineered = set(ENGINEERED_NUMERIC + ENGINEERED_CATEGORICAL)
+        self.columns_ = [c for c in cols if c in X.columns or c in engineered]
+        if not self.drop_original_text:
+            self.columns_ += [c for c in TEXT_COLS if c in X.columns and c not in self.columns_]
         return self
 
     @staticmethod
     def _extract_title(name: str) -> str:
         if not isinstance(name, str):
             return "Rare"
-        match = re.search(r",\s*([^.]*)\.", name)
+        match = _TITLE_RE.search(name)
         title = match.group(1).strip() if match else "Rare"
-        mapping = {
-            "Mlle": "Miss",
-            "Ms": "Miss",
-            "Mme": "Mrs",
-            "Lady": "Rare",
-            "Countess": "Rare",
-            "Capt": "Rare",
-            "Col": "Rare",
-            "Don": "Rare",
-            "Dr": "Rare",
-            "Major": "Rare",
-            "Rev": "Rare",
-            "Sir": "Rare",
-            "Jonkheer": "Rare",
-            "Dona": "Rare",
-        }
-        title = mapping.get(title, title)
+        title = _TITLE_MAP.get(title, title)
         if title not in {"Mr", "Mrs", "Miss", "Master"}:
             title = "Rare"
         return title
@@ -84,7 +119,7 @@ class TitanicFeatureEngineer(BaseEstimator, TransformerMixin):
             return "NONE"
         # quitar dígitos, puntos, barras duplicadas y espacios
         cleaned = ticket.replace(".", " ").replace("/", " ")
-        cleaned = re.sub(r"\s+", " ", cleaned).strip()
+        cleaned = _WS_RE.sub(" ", cleaned).strip()
         # prefijo alfanumérico antes del último bloque numérico
         parts = cleaned.split(" ")
         alnum = [p for p in parts if not p.isdigit()]
@@ -95,20 +130,44 @@ class TitanicFeatureEngineer(BaseEstimator, TransformerMixin):
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:  # noqa: N803 (sklearn)
         X = X.copy()
 
-        # FamilySize e IsAlone
-        X["FamilySize"] = X.get("SibSp", 0).fillna(0) + X.get("Parch", 0).fillna(0) + 1
-        X["IsAlone"] = (X["FamilySize"] == 1).astype(int)
-
-        # Title
-        X["Title"] = X["Name"].apply(self._extract_title) if "Name" in X else "Rare"
-
-        # Deck
-        X["Deck"] = X["Cabin"].apply(self._extract_deck) if "Cabin" in X else "U"
-
-        # TicketPrefix
-        X["TicketPrefix"] = (
-            X["Ticket"].apply(self._extract_ticket_prefix) if "Ticket" in X else "NONE"
-        )
+        # FamilySize e IsAlone (suma NumPy, sin alineación de índices)
+        sibsp = X["SibSp"].fillna(0).to_numpy() if "SibSp" in X.columns else 0
+        parch = X["Parch"].fillna(0).to_numpy() if "Parch" in X.columns else 0
+        X["FamilySize"] = sibsp + parch + 1
+        X["IsAlone"] = (X["FamilySize"].to_numpy() == 1).astype(np.int8)
+
+        # Title: extracción vectorizada + mapeo a las 4 clases finales
+        if "Name" in X.columns:
+            X["Title"] = (
+                X["Name"]
+                .str.extract(_TITLE_RE, expand=False)
+                .str.strip()
+                .map(_TITLE_FINAL_MAP)
+                .fillna("Rare")
+            )
+        else:
+            X["Title"] = "Rare"
+
+        # Deck: primera letra de la cabina en mayúscula
+        if "Cabin" in X.columns:
+            X["Deck"] = X["Cabin"].str[0].str.upper().fillna("U")
+        else:
+            X["Deck"] = "U"
+
+        # TicketPrefix: limpieza y extracción del primer bloque no numérico
+        if "Ticket" in X.columns:
+            cleaned = (
+                X["Ticket"]
+                .str.replace(".", " ", regex=False)
+                .str.replace("/", " ", regex=False)
+                .str.replace(_WS_RE, " ", regex=True)
+                .str.strip()
+            )
+            X["TicketPrefix"] = (
+                cleaned.str.extract(_TICKET_PREFIX_RE, expand=False).str.upper().fillna("NONE")
+            )
+        else:
+            X["TicketPrefix"] = "NONE"
 
         # ordenar columnas clave primero
         cols = (
@@ -126,7 +185,6 @@ class TitanicFeatureEngineer(BaseEstimator, TransformerMixin):
                 if c in X.columns and c not in X_out.columns:
                     X_out[c] = X[c]
 
-        self.columns_ = list(X_out.columns)
         return X_out
 
 
@@ -158,15 +216,26 @@ def build_preprocessor(kind: str = "tree") -> ColumnTransformer:
     return preprocessor
 
 
-def build_pipeline(model, kind: str = "tree") -> Pipeline:
-    """Construye una Pipeline completa: FeatureEngineering + Preprocesador + Modelo."""
-    return Pipeline(
-        steps=[
-            ("feat_eng", TitanicFeatureEngineer()),
-            ("preprocessor", build_preprocessor(kind=kind)),
-            ("clf", model),
-        ]
-    )
+def build_pipeline(model, kind: str = "tree", memory=_DEFAULT_PIPE_MEMORY, include_feat_eng: bool = True) -> Pipeline:
+    """Construye una Pipeline completa: FeatureEngineering + Preprocesador + Modelo.
+
+    `memory` (ruta o joblib.Memory) memoiza el fit de los pasos de
+    preprocesamiento: en GridSearchCV cada candidato sobre el mismo split
+    reutiliza el preprocesador ya ajustado en vez de re-ajustarlo. Por
+    defecto se usa un caché compartido (ruta en la variable de entorno
+    SKLEARN_PIPE_CACHE, si no reports/.pipe_cache); `memory=None` lo desactiva.
+
+    Con `include_feat_eng=False` se omite el paso de ingeniería: útil cuando
+    el llamador ya transformó X una sola vez fuera de la búsqueda (el paso es
+    determinista por fila, así que hacerlo fuera de la CV no filtra información).
+    """
+    steps = [
+        ("preprocessor", build_preprocessor(kind=kind)),
+        ("clf", model),
+    ]
+    if include_feat_eng:
+        steps.insert(0, ("feat_eng", TitanicFeatureEngineer()))
+    return Pipeline(steps=steps, memory=memory)
 
 
 def get_output_feature_names(preproc: ColumnTransformer, input_columns: List[str]) -> List[str]:
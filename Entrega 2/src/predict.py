@@ -1,7 +1,7 @@
 """Predicción con modelos entrenados para Titanic.
 
 Uso:
-    python -m src.predict --model models/rf.pkl --input data/tested.csv --output predictions.csv [--compare]
+    python -m src.predict --model models/rf.joblib.lz4 --input data/tested.csv --output predictions.csv [--compare]
 
 Notas:
 - Si el CSV de entrada contiene la columna 'Survived', por defecto NO se generan predicciones
@@ -25,10 +25,28 @@ from .utils import get_logger, set_global_seed, RANDOM_STATE
 
 logger = get_logger(__name__)
 
+# Columnas que TitanicFeatureEngineer realmente consume, más el id para la
+# salida y la etiqueta para el modo --compare. Limitar el parseo a estas
+# recorta tiempo y memoria en CSVs anchos.
+_REQUIRED_COLS = {
+    "PassengerId",
+    "Survived",
+    "Pclass",
+    "Sex",
+    "Age",
+    "SibSp",
+    "Parch",
+    "Fare",
+    "Embarked",
+    "Name",
+    "Cabin",
+    "Ticket",
+}
+
 
 def main():
     parser = argparse.ArgumentParser(description="Predice con un modelo entrenado del Titanic.")
-    parser.add_argument("--model", required=True, help="Ruta al archivo .pkl del modelo.")
+    parser.add_argument("--model", required=True, help="Ruta al modelo serializado (.joblib.lz4 o .pkl).")
     parser.add_argument("--input", required=True, help="Ruta al CSV de entrada.")
     parser.add_argument("--output", required=True, help="Ruta al CSV de salida de predicciones.")
     parser.add_argument("--compare", action="store_true", help="Si el CSV tiene 'Survived', evalúa en lugar de predecir.")
@@ -42,9 +60,13 @@ def main():
         raise FileNotFoundError(f"No se encontró el CSV de entrada: {args.input}")
 
     logger.info(f"Cargando modelo desde {args.model}")
-    model = joblib.load(args.model)
+    # Solo lectura: mmap evita copiar los arreglos del modelo al heap y
+    # acelera cargas repetidas vía el page cache del SO (no aplica a
+    # archivos comprimidos).
+    mmap = None if args.model.endswith(".lz4") else "r"
+    model = joblib.load(args.model, mmap_mode=mmap)
 
-    df = pd.read_csv(args.input)
+    df = pd.read_csv(args.input, usecols=lambda c: c in _REQUIRED_COLS)
 
     if "Survived" in df.columns:
         if not args.compare:
@@ -86,11 +108,11 @@ def main():
 
     # Predicción sobre datos sin etiqueta
     logger.info("Generando predicciones...")
-    X_new = df.copy()
-    preds = model.predict(X_new)
-    out_df = df.copy()
-    out_df["Prediction"] = preds
-    out_df.to_csv(args.output, index=False)
+    preds = model.predict(df)
+    # Formato de submission: solo id + predicción, sin copiar el DataFrame
+    # de entrada completo (el usuario ya tiene ese CSV).
+    pid = df["PassengerId"] if "PassengerId" in df.columns else pd.RangeIndex(len(df))
+    pd.DataFrame({"PassengerId": pid, "Prediction": preds}).to_csv(args.output, index=False)
     logger.info(f"Predicciones guardadas en {args.output}")
 
 
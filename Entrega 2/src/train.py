@@ -4,7 +4,7 @@ Uso:
     python -m src.train --data data/tested.csv --models rf mlp hgb --save_dir models
 
 Guarda:
-- models/rf.pkl, models/mlp.pkl, models/hgb.pkl, (opcional) models/xgb.pkl
+- models/rf.joblib.lz4, models/mlp.joblib.lz4, models/hgb.joblib.lz4, (opcional) models/xgb.joblib.lz4
 - reports/metrics/cv_results_*.csv
 
 Todas las semillas fijadas en 42 para reproducibilidad.
@@ -19,13 +19,30 @@ from typing import Dict, List, Tuple
 import joblib
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
-from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV,
+    StratifiedKFold,
+)
 from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
 
-from .features import build_pipeline
+from .features import TitanicFeatureEngineer, build_pipeline
 from .utils import RANDOM_STATE, ensure_dir, get_logger, set_global_seed, train_test_split_fixed, timer
 
+# xgboost es opcional: importarlo una sola vez al cargar el módulo evita
+# repetir la inicialización de su librería C++ en cada llamada al builder
+# (y los workers de loky heredan el import al hacer fork).
+try:
+    from xgboost import XGBClassifier  # type: ignore
+
+    _HAS_XGB = True
+except Exception:  # pragma: no cover
+    _HAS_XGB = False
+
 
 logger = get_logger(__name__)
 
@@ -37,13 +54,13 @@ def load_data(path: str) -> pd.DataFrame:
     return df
 
 
-def build_search_rf() -> Tuple[RandomizedSearchCV, str]:
+def build_search_rf(cv=None) -> Tuple[HalvingRandomSearchCV, str]:
     rf = RandomForestClassifier(
         random_state=RANDOM_STATE,
         class_weight="balanced",
         n_jobs=-1,
     )
-    pipe = build_pipeline(rf, kind="tree")
+    pipe = build_pipeline(rf, kind="tree", include_feat_eng=False)
     param_distributions = {
         "clf__n_estimators": [100, 200, 300, 500],
         "clf__max_depth": [None, 5, 10, 15, 20, 30],
@@ -51,11 +68,17 @@ def build_search_rf() -> Tuple[RandomizedSearchCV, str]:
         "clf__min_samples_leaf": [1, 2, 4, 8],
         "clf__max_features": [None, "sqrt", "log2"],
     }
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
-    search = RandomizedSearchCV(
+    if cv is None:
+        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    # Halving sucesivo: la mayoría de candidatos se descarta con pocos datos
+    # y solo los supervivientes se ajustan con el conjunto completo.
+    search = HalvingRandomSearchCV(
         estimator=pipe,
         param_distributions=param_distributions,
-        n_iter=20,
+        n_candidates=20,
+        factor=3,
+        resource="n_samples",
+        min_resources="exhaust",
         scoring="f1_macro",
         cv=cv,
         n_jobs=-1,
@@ -66,48 +89,70 @@ def build_search_rf() -> Tuple[RandomizedSearchCV, str]:
     return search, "rf"
 
 
-def build_search_mlp() -> Tuple[GridSearchCV, str]:
+def build_search_mlp(cv=None) -> Tuple[HalvingGridSearchCV, str]:
+    # adam + parada temprana sobre un 10% de validación interna: las
+    # configuraciones convergidas (o que no aprenden) terminan en pocas
+    # épocas en vez de agotar max_iter en cada celda de la búsqueda.
     mlp = MLPClassifier(
+        solver="adam",
         random_state=RANDOM_STATE,
         early_stopping=True,
-        max_iter=1000,
+        validation_fraction=0.1,
+        n_iter_no_change=10,
+        tol=1e-4,
+        max_iter=500,
     )
-    pipe = build_pipeline(mlp, kind="scaled")
+    pipe = build_pipeline(mlp, kind="scaled", include_feat_eng=False)
     param_grid = {
         "clf__hidden_layer_sizes": [(64,), (128,), (64, 32)],
         "clf__alpha": [1e-5, 1e-4, 1e-3],
         "clf__learning_rate_init": [1e-3, 5e-4],
     }
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
-    search = GridSearchCV(
+    if cv is None:
+        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    search = HalvingGridSearchCV(
         estimator=pipe,
         param_grid=param_grid,
+        factor=3,
+        resource="n_samples",
+        min_resources="exhaust",
         scoring="f1_macro",
         cv=cv,
         n_jobs=-1,
         refit=True,
+        random_state=RANDOM_STATE,
         verbose=1,
     )
     return search, "mlp"
 
 
-def build_search_hgb() -> Tuple[RandomizedSearchCV, str]:
+def build_search_hgb(cv=None) -> Tuple[HalvingRandomSearchCV, str]:
+    # early_stopping='auto' solo se activa con >10k muestras; en Titanic hay
+    # que pedirlo explícito para no pagar iteraciones tras la meseta de
+    # validación en cada celda de la búsqueda.
     hgb = HistGradientBoostingClassifier(
         learning_rate=0.1,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=15,
         random_state=RANDOM_STATE,
     )
-    pipe = build_pipeline(hgb, kind="tree")
+    pipe = build_pipeline(hgb, kind="tree", include_feat_eng=False)
     param_distributions = {
         "clf__learning_rate": [0.05, 0.1, 0.2],
         "clf__max_depth": [None, 3, 5, 7, 10],
         "clf__max_leaf_nodes": [15, 31, 63],
         "clf__min_samples_leaf": [10, 20, 30],
     }
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
-    search = RandomizedSearchCV(
+    if cv is None:
+        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    search = HalvingRandomSearchCV(
         estimator=pipe,
         param_distributions=param_distributions,
-        n_iter=15,
+        n_candidates=15,
+        factor=3,
+        resource="n_samples",
+        min_resources="exhaust",
         scoring="f1_macro",
         cv=cv,
         n_jobs=-1,
@@ -118,12 +163,24 @@ def build_search_hgb() -> Tuple[RandomizedSearchCV, str]:
     return search, "hgb"
 
 
-def build_search_xgb():
+def _xgb_device() -> str:
+    """Devuelve 'cuda' si hay una GPU NVIDIA utilizable, si no 'cpu'."""
     try:
-        from xgboost import XGBClassifier  # type: ignore
+        import cupy  # type: ignore
+
+        return "cuda" if cupy.cuda.runtime.getDeviceCount() > 0 else "cpu"
     except Exception:  # pragma: no cover
+        return "cpu"
+
+
+def build_search_xgb(cv=None):
+    if not _HAS_XGB:
         return None, None
 
+    # Nota: early_stopping_rounds exigiría pasar clf__eval_set en fit(), pero
+    # dentro de la Pipeline ese conjunto llegaría sin pasar por feat_eng ni
+    # preprocessor. Las rondas desperdiciadas se acotan con el halving
+    # (candidatos malos se descartan con pocas muestras) y n_estimators moderado.
     xgb = XGBClassifier(
         objective="binary:logistic",
         n_estimators=300,
@@ -135,21 +192,30 @@ def build_search_xgb():
         random_state=RANDOM_STATE,
         n_jobs=-1,
         tree_method="hist",
+        # device='cuda' es el reemplazo vigente de tree_method='gpu_hist';
+        # max_bin explícito para que CPU y GPU usen histogramas comparables.
+        device=_xgb_device(),
+        max_bin=256,
     )
-    pipe = build_pipeline(xgb, kind="tree")
+    pipe = build_pipeline(xgb, kind="tree", include_feat_eng=False)
     param_grid = {
         "clf__max_depth": [3, 5, 7],
         "clf__min_child_weight": [1, 3, 5],
         "clf__gamma": [0, 0.1],
     }
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
-    search = GridSearchCV(
+    if cv is None:
+        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    search = HalvingGridSearchCV(
         estimator=pipe,
         param_grid=param_grid,
+        factor=3,
+        resource="n_samples",
+        min_resources="exhaust",
         scoring="f1_macro",
         cv=cv,
         n_jobs=-1,
         refit=True,
+        random_state=RANDOM_STATE,
         verbose=1,
     )
     return search, "xgb"
@@ -157,17 +223,24 @@ def build_search_xgb():
 
 def fit_and_save(
     search, name: str,
-    X_train: pd.DataFrame, y_train: pd.Series,
+    X_train: pd.DataFrame, y_train,
     out_models_dir: str, out_reports_dir: str,
+    feat_eng: TitanicFeatureEngineer = None,
 ) -> Dict[str, str]:
     logger.info(f"Entrenando modelo {name}...")
     with timer(f"fit_{name}"):
         search.fit(X_train, y_train)
     best = search.best_estimator_
+    if feat_eng is not None:
+        # Recomponer la pipeline completa para inferencia: los pasos ya están
+        # ajustados, así que el modelo guardado sigue aceptando CSVs crudos.
+        best = Pipeline(steps=[("feat_eng", feat_eng), *best.steps])
 
     ensure_dir(out_models_dir)
-    model_path = os.path.join(out_models_dir, f"{name}.pkl")
-    joblib.dump(best, model_path)
+    model_path = os.path.join(out_models_dir, f"{name}.joblib.lz4")
+    # LZ4 nivel 3: reduce 2-4x el tamaño de los pickles de ensambles y suele
+    # acortar el dump porque el cuello de botella es el ancho de banda a disco.
+    joblib.dump(best, model_path, compress=("lz4", 3))
     logger.info(f"Modelo guardado en {model_path}")
 
     # guardar cv_results
@@ -199,6 +272,23 @@ def main():
     X_train, X_test, y_train, y_test = train_test_split_fixed(df, target_col="Survived", test_size=0.2)
     logger.info(f"Split: train={X_train.shape}, test={X_test.shape}")
 
+    # Trabajo compartido entre las búsquedas: la ingeniería de variables es
+    # determinista por fila, así que se aplica UNA vez aquí en lugar de
+    # modelos x candidatos x folds veces dentro de cada pipeline. El
+    # ColumnTransformer sí queda dentro (ajustarlo fuera de la CV filtraría
+    # medianas/categorías entre folds). La etiqueta se codifica una sola vez.
+    feat_eng = TitanicFeatureEngineer().fit(X_train)
+    X_train_fe = feat_eng.transform(X_train)
+    y_train_enc = y_train.to_numpy(dtype=np.int8)
+
+    # Folds materializados una sola vez y compartidos por las 4 búsquedas:
+    # con índices idénticos, las claves de joblib.Memory del preprocesador
+    # coinciden entre modelos (el halving submuestrea DENTRO de cada fold,
+    # así que los índices precalculados siguen siendo válidos).
+    cv_splits = list(
+        StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE).split(X_train_fe, y_train_enc)
+    )
+
     model_builders = {
         "rf": build_search_rf,
         "mlp": build_search_mlp,
@@ -206,21 +296,34 @@ def main():
         "xgb": build_search_xgb,
     }
 
-    results: Dict[str, Dict[str, str]] = {}
-
+    built: List[Tuple[object, str]] = []
     for m in args.models:
         builder = model_builders[m]
-        search, name = builder()
+        search, name = builder(cv=cv_splits)
         if search is None:  # xgb no disponible
             logger.warning("xgboost no disponible; omitiendo XGBClassifier.")
             continue
-        paths = fit_and_save(
-            search, name,
-            X_train, y_train,
-            out_models_dir=args.save_dir,
-            out_reports_dir=args.reports_dir,
+        built.append((search, name))
+
+    results: Dict[str, Dict[str, str]] = {}
+    if built:
+        # Dos niveles de paralelismo: un proceso por modelo y el resto de los
+        # núcleos repartidos entre los folds de cada búsqueda, para no
+        # sobresuscribir (total de hilos ~ núcleos físicos).
+        inner_jobs = max(1, (os.cpu_count() or 1) // len(built))
+        for search, _ in built:
+            search.n_jobs = inner_jobs
+        outputs = Parallel(n_jobs=len(built), backend="loky")(
+            delayed(fit_and_save)(
+                search, name,
+                X_train_fe, y_train_enc,
+                out_models_dir=args.save_dir,
+                out_reports_dir=args.reports_dir,
+                feat_eng=feat_eng,
+            )
+            for search, name in built
         )
-        results[name] = paths
+        results = {name: paths for (_, name), paths in zip(built, outputs)}
 
     # guardar resumen simple
     ensure_dir(os.path.join(args.reports_dir, "metrics"))
@@ -17,7 +17,7 @@ from typing import Iterator, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
 
 
 RANDOM_STATE = 42
@@ -62,10 +62,18 @@ def train_test_split_fixed(
     test_size: float = 0.2,
     random_state: int = RANDOM_STATE,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
-    """Realiza una división estratificada train/test con parámetros fijos."""
-    X = df.drop(columns=[target_col])
-    y = df[target_col].astype(int)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state, stratify=y
-    )
+    """Realiza una división estratificada train/test con parámetros fijos.
+
+    Divide sobre índices con StratifiedShuffleSplit (lo que train_test_split
+    usa por dentro, así que los splits son idénticos) y selecciona con .iloc:
+    evita materializar la copia completa de las features que hacía
+    df.drop(columns=[target_col]) antes de partir.
+    """
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_idx, test_idx = next(sss.split(np.zeros(len(df)), df[target_col]))
+    feat_cols = [c for c in df.columns if c != target_col]
+    X_train = df.iloc[train_idx][feat_cols]
+    X_test = df.iloc[test_idx][feat_cols]
+    y_train = df[target_col].iloc[train_idx].astype(int)
+    y_test = df[target_col].iloc[test_idx].astype(int)
     return X_train, X_test, y_train, y_test
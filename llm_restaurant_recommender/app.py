@@ -1,14 +1,25 @@
 import streamlit as st
 import config
-import math
+import pandas as pd
 
 from utils.geolocation import resolve_location, search_restaurants
 from utils.llm_processing import analyze_query, generate_explanations
 from utils.logger import get_logger
-from utils.ranking import rank_restaurants
+from utils.ranking import rank_restaurants, warm_up_kernels
 
 logger = get_logger(__name__)
 
+
+@st.cache_resource
+def _warm_ranking_kernels():
+    # Compila los kernels numba (si están instalados) al arrancar, para que
+    # el primer usuario no pague el tiempo de compilación JIT.
+    warm_up_kernels()
+    return True
+
+
+_warm_ranking_kernels()
+
 st.set_page_config(page_title="Asistente LLM - Restaurantes Yelp", layout="centered")
 
 st.title("Asistente LLM: Recomendador de restaurantes (Yelp Dataset)")
@@ -18,6 +29,24 @@ st.title("Asistente LLM: Recomendador de restaurantes (Yelp Dataset)")
 def cached_restaurant_search(location_key, cuisine, radius):
     return search_restaurants(location_key, cuisine=cuisine, radius=radius)
 
+
+@st.cache_data(show_spinner=False, ttl=config.QUERY_CACHE_TTL)
+def cached_analyze_query(query_key):
+    return analyze_query(query_key)
+
+
+@st.cache_data(show_spinner=False, ttl=config.LOCATION_CACHE_TTL)
+def cached_resolve_location(location_key):
+    return resolve_location(location_key)
+
+
+@st.cache_data(show_spinner=False, ttl=config.QUERY_CACHE_TTL)
+def cached_explanations(query_key, names_key, _restaurants):
+    # La clave del caché es (consulta, tupla de nombres del top-K): re-rankear
+    # sin cambiar el top-K reutiliza la salida del LLM. El prefijo "_" excluye
+    # la lista de registros del hash de Streamlit.
+    return generate_explanations(query_key, _restaurants)
+
 with st.form("query_form"):
     user_query = st.text_input("¿Qué buscas?", placeholder="Ej: Quiero una pizza económica en Philadelphia")
     manual_location = st.text_input("Ubicación (opcional, si no se detecta automáticamente):", placeholder="Ej: Philadelphia, PA")
@@ -50,7 +79,8 @@ if submitted and user_query.strip():
     st.info("Procesando consulta...")
     
     try:
-        prefs = analyze_query(user_query)
+        # Normalizar la consulta sube la tasa de aciertos del caché
+        prefs = cached_analyze_query(user_query.strip().lower())
         st.write("Preferencias detectadas:", prefs)
     except Exception as e:
         logger.error(f"Error analyzing query: {e}")
@@ -66,7 +96,7 @@ if submitted and user_query.strip():
         logger.warning("No location provided")
     else:
         try:
-            coords = resolve_location(loc_text)
+            coords = cached_resolve_location(loc_text.strip().lower())
             if coords is None:
                 st.error(f"❌ No pude geocodificar la ubicación: {loc_text}")
                 logger.warning(f"Failed to geocode: {loc_text}")
@@ -82,69 +112,92 @@ if submitted and user_query.strip():
             # Call cached search (handles remote API + dataset fallback)
             logger.info(f"Searching restaurants (radius={radius}m, cuisine={prefs.get('cuisine')})")
             df = cached_restaurant_search((coords[0], coords[1]), cuisine=prefs.get("cuisine"), radius=radius)
-            
+
             if df.empty:
                 st.warning("No se encontraron restaurantes en la zona con esos criterios.")
                 logger.info("No restaurants found")
+                st.session_state.pop("ranked_results", None)
             else:
                 logger.info(f"Found {len(df)} restaurants")
-                
+
                 # Rank using user coordinates
                 try:
-                    df_ranked = rank_restaurants(df, prefs, user_coords=coords)
-                    top = df_ranked.head(int(top_k)).copy()
+                    # top_k selecciona en O(N) dentro del ranking; no hace
+                    # falta ordenar el catálogo completo para quedarse con K.
+                    # max_distance_m asegura distancia exacta para toda fila
+                    # dentro del radio elegido por el usuario.
+                    top = rank_restaurants(df, prefs, user_coords=coords, top_k=int(top_k), max_distance_m=float(radius))
                     logger.info(f"Ranked and selected top {len(top)} restaurants")
                 except Exception as e:
                     logger.error(f"Error ranking restaurants: {e}")
                     st.error("❌ Error al ordenar los restaurantes.")
                     st.stop()
 
-                # Optional: generate explanations with LLM (can be slow on CPU)
-                explain = st.checkbox("Generar explicaciones con LLM (lento en CPU)", value=False)
-                if explain:
-                    try:
-                        explanations = generate_explanations(user_query, top.to_dict(orient="records"))
-                        top["explanation"] = explanations
-                    except Exception as e:
-                        logger.error(f"Error generating explanations: {e}")
-                        top["explanation"] = ["Información no disponible"] * len(top)
-                else:
-                    top["explanation"] = [""] * len(top)
-
-                st.subheader(f"Top {len(top)} resultados")
-                for idx, row in top.iterrows():
-                    name = row.get("name") or "(sin nombre)"
-                    address = row.get("address") or "Dirección no disponible"
-                    # distance may be NaN; convert safely
-                    _d = row.get("distance_m")
-                    try:
-                        _dv = float(_d) if _d is not None else 0.0
-                        dist = 0 if math.isnan(_dv) else int(_dv)
-                    except Exception:
-                        dist = 0
-                    price_range = row.get("price_range") or row.get("price") or "precio no disponible"
-                    opening = row.get("opening_hours") or "Horario no informado"
-                    source = row.get("source") or "fuente desconocida"
-                    explanation = row.get("explanation") or ""
-                    with st.expander(f"{name} — {dist} m"):
-                        st.markdown(f"**{name}**")
-                        st.write(address)
-                        st.write(f"Distancia: {dist} m")
-                        st.write(f"Precio estimado: {price_range}")
-                        st.write(f"Horario: {opening}")
-                        st.write(explanation)
-                        st.caption(f"Fuente de datos: {source}")
-
-                st.success(f"Mostrando {len(top)} resultados.")
-        
+                # Persistir el ranking: los checkboxes de abajo provocan un
+                # rerun en el que submitted vuelve a False, así que los
+                # resultados deben sobrevivir fuera de esta rama.
+                st.session_state["ranked_results"] = top
+                st.session_state["ranked_query"] = user_query
+
         except Exception as e:
             logger.error(f"Error during restaurant search: {e}")
             st.error("❌ Error al buscar restaurantes. Por favor, intenta de nuevo.")
             st.stop()
 
+if "ranked_results" in st.session_state:
+    top = st.session_state["ranked_results"].copy()
+    ranked_query = st.session_state.get("ranked_query", "")
+
+    # Optional: generate explanations with LLM (can be slow on CPU)
+    explain = st.checkbox("Generar explicaciones con LLM (lento en CPU)", value=False)
+    if explain:
+        try:
+            records = top.to_dict(orient="records")
+            names_key = tuple(r.get("name") for r in records)
+            explanations = cached_explanations(ranked_query, names_key, records)
+            top["explanation"] = explanations
+        except Exception as e:
+            logger.error(f"Error generating explanations: {e}")
+            top["explanation"] = ["Información no disponible"] * len(top)
+    else:
+        top["explanation"] = [""] * len(top)
+
+    st.subheader(f"Top {len(top)} resultados")
+    # Una sola tabla en vez de un widget por fila: iterrows
+    # materializa una Series por registro y cada expander suma
+    # overhead de render en Streamlit.
+    display = top
+    # replace cubre NaN e inf antes del cast a int (astype(int)
+    # lanza IntCastingNaNError sobre valores no finitos)
+    dist_num = pd.to_numeric(display.get("distance_m"), errors="coerce")
+    display["distance_m"] = (
+        dist_num.replace([float("inf"), float("-inf")], 0).fillna(0).astype(int)
+    )
+    if "price_range" not in display.columns and "price" in display.columns:
+        display["price_range"] = display["price"]
+    display_cols = ["name", "address", "distance_m", "price_range", "opening_hours", "explanation", "source"]
+    display = display[[c for c in display_cols if c in display.columns]]
+    st.dataframe(display, hide_index=True, use_container_width=True)
+
+    if st.checkbox("Ver detalles por restaurante", value=False):
+        # to_dict('records') evita el boxing por celda de iterrows
+        for row in display.to_dict("records"):
+            name = row.get("name") or "(sin nombre)"
+            dist = row.get("distance_m", 0)
+            with st.expander(f"{name} — {dist} m"):
+                st.markdown(f"**{name}**")
+                st.write(row.get("address") or "Dirección no disponible")
+                st.write(f"Distancia: {dist} m")
+                st.write(f"Precio estimado: {row.get('price_range') or 'precio no disponible'}")
+                st.write(f"Horario: {row.get('opening_hours') or 'Horario no informado'}")
+                st.write(row.get("explanation") or "")
+                st.caption(f"Fuente de datos: {row.get('source') or 'fuente desconocida'}")
+
+    st.success(f"Mostrando {len(top)} resultados.")
+
 else:
     st.write("Introduce una consulta en lenguaje natural arriba y presiona 'Buscar'.")
-    
+
     st.markdown("---")
     st.markdown("### 📊 Información del Dataset")
     st.markdown("""
@@ -153,7 +206,7 @@ else:
     - **Restaurantes:** 318 establecimientos abiertos
     - **Tipos de cocina:** 103 diferentes
     - **Rating promedio:** 3.58/5.0
-    
+
     **Ejemplos de búsqueda:**
     - "Quiero una pizza barata"
     - "Busco un café cerca de la estación"
@@ -8,6 +8,11 @@ DATA_DIR = PROJECT_ROOT / "data"
 MODELS_DIR = PROJECT_ROOT / "models"
 LOGS_DIR = PROJECT_ROOT / "logs"
 
+# Dataset files (resolved once here; scripts take them as argparse defaults)
+RESTAURANTS_CSV = DATA_DIR / "restaurants_sample.csv"
+LOCAL_DATASET_CSV = DATA_DIR / "restaurants_yelp.csv"
+REVIEWS_CSV = DATA_DIR / "generated_reviews.csv"
+
 # API URLs
 OVERPASS_URL = "http://overpass-api.de/api/interpreter"
 
@@ -29,6 +34,10 @@ MAX_TOP_K = 20
 MIN_QUERY_LENGTH = 3
 MAX_QUERY_LENGTH = 500
 
+# Ranking: distance beyond which a restaurant scores 0 on proximity (meters).
+# Also bounds the bounding-box prefilter that skips haversine for far rows.
+MAX_RANKING_DISTANCE_M = 5000.0
+
 # Ranking weights
 RANKING_WEIGHTS = {
     "distance": 0.5,
@@ -55,3 +64,5 @@ LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
 # Cache TTL (seconds)
 SEARCH_CACHE_TTL = 600  # 10 minutes
+QUERY_CACHE_TTL = 3600  # 1 hour (LLM analysis of identical queries)
+LOCATION_CACHE_TTL = 86400  # 24 hours (geocoded coordinates rarely change)
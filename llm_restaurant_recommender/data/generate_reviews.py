@@ -17,30 +17,42 @@ from typing import Optional
 
 import pandas as pd
 import config
-from utils.llm_processing import ModelWrapper
+from utils.llm_processing import get_model
 
-MODEL = ModelWrapper()
+# instancia compartida: una segunda ModelWrapper cargaría los pesos de nuevo
+MODEL = get_model()
+
+# compilado una vez a nivel de módulo (re.split recompila por llamada)
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
 
 
 def first_sentences(text: str, max_sentences: int = 2) -> str:
-    parts = re.split(r'(?<=[.!?])\s+', text.strip())
+    parts = _SENT_RE.split(text.strip())
     return ' '.join(parts[:max_sentences]).strip()
 
 
+# Prefijo fijo compartido por todos los prompts del lote. Mantenerlo idéntico
+# byte a byte (las instrucciones primero, los datos del restaurante al final)
+# permite a backends con caché de prefijos (vLLM, llama.cpp) reutilizar el KV
+# cache del prefill entre restaurantes en vez de recomputarlo por prompt.
+SYSTEM_PROMPT = (
+    "Eres un asistente conciso y amable. Genera una reseña muy corta (1-2 oraciones) en español "
+    "sobre un restaurante para un usuario que busca opciones locales. "
+    "La reseña debe explicar brevemente por qué podría interesar y dar un consejo práctico (ej: 'reservar') si procede. "
+    "Responde solo con la reseña en español.\n\n"
+)
+
+
 def build_prompt(row: dict) -> str:
     name = row.get('name') or 'Este restaurante'
     cuisine = row.get('cuisine') or 'varios'
     address = row.get('address') or ''
     opening = row.get('opening_hours') or ''
     tags = row.get('tags') or ''
-    prompt = (
-        f"Eres un asistente conciso y amable. Genera una reseña muy corta (1-2 oraciones) en español "
-        f"sobre este restaurante para un usuario que busca opciones locales. Restaurante: {name}. "
-        f"Cocina: {cuisine}. Dirección: {address}. Horario (si se conoce): {opening}. Tags: {tags}. "
-        "La reseña debe explicar brevemente por qué podría interesar y dar un consejo práctico (ej: 'reservar') si procede. "
-        "Responde solo con la reseña en español."
+    return (
+        f"{SYSTEM_PROMPT}Restaurante: {name}. Cocina: {cuisine}. Dirección: {address}. "
+        f"Horario (si se conoce): {opening}. Tags: {tags}."
     )
-    return prompt
 
 
 def fallback_review(row: dict) -> str:
@@ -50,19 +62,19 @@ def fallback_review(row: dict) -> str:
 
 
 def generate_for_df(df: pd.DataFrame) -> pd.DataFrame:
-    reviews = []
-    for _, row in df.iterrows():
-        prompt = build_prompt(row)
-        try:
-            txt = MODEL.generate(prompt, max_new_tokens=config.LLM_EXPLANATION_MAX_TOKENS)
-        except Exception:
-            txt = None
-
-        if not txt:
-            review = fallback_review(row)
-        else:
-            review = first_sentences(txt, max_sentences=2)
+    # Recolectar todos los prompts y generarlos en lote: una sola llamada al
+    # modelo en vez de pagar prefill+decode en serie por restaurante.
+    # to_dict('records') entrega dicts planos sin el boxing por celda de iterrows.
+    rows = df.to_dict(orient='records')
+    prompts = [build_prompt(row) for row in rows]
+    try:
+        texts = MODEL.generate_batch(prompts, max_new_tokens=config.LLM_EXPLANATION_MAX_TOKENS)
+    except Exception:
+        texts = [None] * len(prompts)
 
+    reviews = []
+    for row, txt in zip(rows, texts):
+        review = first_sentences(txt, max_sentences=2) if txt else fallback_review(row)
         reviews.append({
             'restaurant_id': row.get('id'),
             'generated_review': review,
@@ -73,8 +85,8 @@ def generate_for_df(df: pd.DataFrame) -> pd.DataFrame:
 
 def main():
     p = argparse.ArgumentParser(description='Generate synthetic reviews for restaurants CSV')
-    p.add_argument('--input', type=str, default='data/restaurants_yelp.csv', help='Input CSV path')
-    p.add_argument('--output', type=str, default='data/generated_reviews.csv', help='Output CSV path')
+    p.add_argument('--input', default=config.LOCAL_DATASET_CSV, help='Input CSV path')
+    p.add_argument('--output', default=config.REVIEWS_CSV, help='Output CSV path')
     args = p.parse_args()
 
     df = pd.read_csv(args.input)
@@ -33,3 +33,20 @@ class TestSafeParseTags:
         """Test that number returns empty dict."""
         result = safe_parse_tags(123)
         assert result == {}
+
+    def test_json_string_input(self):
+        """Test parsing JSON (double-quoted) tag strings."""
+        result = safe_parse_tags('{"cuisine": "sushi", "price": "$$"}')
+        assert result == {"cuisine": "sushi", "price": "$$"}
+
+    def test_non_dict_literal(self):
+        """Test that non-dict literals return empty dict."""
+        assert safe_parse_tags("[1, 2, 3]") == {}
+        assert safe_parse_tags("123") == {}
+
+    def test_cache_not_poisoned_by_mutation(self):
+        """Mutating a returned dict must not affect later parses."""
+        raw = '{"price": "$"}'
+        first = safe_parse_tags(raw)
+        first["injected"] = True
+        assert safe_parse_tags(raw) == {"price": "$"}
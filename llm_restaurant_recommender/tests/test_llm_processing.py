@@ -66,7 +66,27 @@ class TestExtractJsonFromText:
         """Test when malformed JSON is present."""
         text = "Text with {invalid json} here"
         result = _extract_json_from_text(text)
-        
+
+        assert result is None
+
+    def test_extract_skips_malformed_candidate(self):
+        """A malformed first candidate doesn't hide a valid object later."""
+        text = '{broken} then {"cuisine": "sushi"} trailing'
+        result = _extract_json_from_text(text)
+
+        assert result == {"cuisine": "sushi"}
+
+    def test_extract_nested_braces(self):
+        """Nested objects are returned whole, not cut at the inner brace."""
+        text = 'reply: {"outer": {"inner": 1}, "k": 2}'
+        result = _extract_json_from_text(text)
+
+        assert result == {"outer": {"inner": 1}, "k": 2}
+
+    def test_extract_non_dict_json_ignored(self):
+        """Only dict results count; unbraced scalars/arrays return None."""
+        result = _extract_json_from_text("values: [1, 2, 3] and 42")
+
         assert result is None
 
 
@@ -1,7 +1,8 @@
 """Tests for ranking utilities."""
+import numpy as np
 import pandas as pd
 import pytest
-from utils.ranking import haversine_meters, rank_restaurants, PRICE_SYMBOLS
+from utils.ranking import haversine_meters, rank_restaurants, PRICE_SYMBOLS, _price_buckets
 
 
 class TestHaversineMeters:
@@ -60,3 +61,100 @@ class TestRankRestaurants:
         assert "distance_m" in result.columns
         # First result should be Italian restaurant (cuisine match)
         assert result.iloc[0]["cuisine"] == "italiano"
+
+
+class TestRankRestaurantsTopK:
+    """Tests for the top_k selection path of rank_restaurants."""
+
+    def _sample_df(self, n=50):
+        rng = np.random.default_rng(7)
+        return pd.DataFrame({
+            "name": [f"r{i}" for i in range(n)],
+            "lat": 6.21 + rng.uniform(-0.02, 0.02, n),
+            "lon": -75.57 + rng.uniform(-0.02, 0.02, n),
+            "cuisine": rng.choice(["italiano", "chino", ""], n),
+            "rating": rng.uniform(0, 5, n),
+        })
+
+    def test_top_k_matches_full_sort(self):
+        """Top-k selection returns the same head as the full sort."""
+        df = self._sample_df()
+        prefs = {"cuisine": "italiano"}
+        full = rank_restaurants(df, prefs, user_coords=(6.21, -75.57))
+        topk = rank_restaurants(df, prefs, user_coords=(6.21, -75.57), top_k=10)
+
+        assert len(topk) == 10
+        assert list(topk["name"]) == list(full["name"].head(10))
+
+    def test_top_k_score_descending(self):
+        """Scores come back in non-increasing order."""
+        df = self._sample_df()
+        result = rank_restaurants(df, {"cuisine": "italiano"}, user_coords=(6.21, -75.57), top_k=10)
+        scores = result["score"].to_numpy()
+
+        assert all(scores[i] >= scores[i + 1] for i in range(len(scores) - 1))
+
+    def test_top_k_distance_tiebreak(self):
+        """Equal scores are broken by distance, nearest first."""
+        df = pd.DataFrame({
+            "name": ["far", "near"],
+            "lat": [6.2200, 6.2110],
+            "lon": [-75.5700, -75.5700],
+            "cuisine": ["italiano", "italiano"],
+            "rating": [4.0, 4.0],
+        })
+        # Zero out the distance weight so both rows tie on the rating score
+        # while keeping different distance_m values for the tie-breaker.
+        weights = {"distance": 0.0, "cuisine": 0.0, "price": 0.0, "rating": 1.0}
+        result = rank_restaurants(df, {}, user_coords=(6.21, -75.57), weights=weights, top_k=2)
+
+        assert result.iloc[0]["score"] == result.iloc[1]["score"]
+        assert result.iloc[0]["name"] == "near"
+
+    def test_top_k_larger_than_frame(self):
+        """top_k beyond the frame length returns every row."""
+        df = self._sample_df(n=5)
+        result = rank_restaurants(df, {}, user_coords=(6.21, -75.57), top_k=100)
+
+        assert len(result) == 5
+
+
+class TestPriceBuckets:
+    """Tests for the vectorized price bucket inference."""
+
+    def test_price_range_label(self):
+        """Explicit price_range labels win, Spanish ones included."""
+        df = pd.DataFrame({"price_range": ["low", "alto", "medio"]})
+        assert list(_price_buckets(df)) == ["low", "high", "medium"]
+
+    def test_price_symbols(self):
+        """Symbolic prices map through PRICE_SYMBOLS."""
+        df = pd.DataFrame({"price": ["$", "$$", "$$$$"]})
+        assert list(_price_buckets(df)) == ["low", "medium", "high"]
+
+    def test_numeric_average_price(self):
+        """Numeric averages bucket on the 30k/60k thresholds."""
+        df = pd.DataFrame({"average_price": [10000, 45000, 90000]})
+        assert list(_price_buckets(df)) == ["low", "medium", "high"]
+
+    def test_tags_fallback(self):
+        """Rows unresolved by the cheap layers fall back to the tags."""
+        df = pd.DataFrame({"tags": ["{'price': '$$$'}", "{}"]})
+        assert list(_price_buckets(df)) == ["high", "unknown"]
+
+    def test_precomputed_column_reused(self):
+        """Staged price_bucket values win over the inference layers."""
+        df = pd.DataFrame({"price_bucket": ["high", "high"], "price": ["$", "$"]})
+        assert list(_price_buckets(df)) == ["high", "high"]
+
+    def test_mixed_frame_infers_unstaged_rows(self):
+        """Rows without a staged bucket (e.g. Overpass) still get inferred."""
+        local = pd.DataFrame({"price_bucket": ["low"], "price_range": ["low"]})
+        overpass = pd.DataFrame({"price_range": ["high"]})
+        df = pd.concat([local, overpass], ignore_index=True)
+        assert list(_price_buckets(df)) == ["low", "high"]
+
+    def test_no_price_information(self):
+        """Frames without any price signal resolve to unknown."""
+        df = pd.DataFrame({"name": ["a", "b"]})
+        assert list(_price_buckets(df)) == ["unknown", "unknown"]
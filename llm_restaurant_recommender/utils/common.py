@@ -1,14 +1,48 @@
 """Common utilities shared across modules."""
 import ast
+import json
+from functools import lru_cache
 from typing import Any, Dict
 
+try:  # optional C JSON codec; ast remains the fallback parser
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=4096)
+def _parse_tag_items(raw: str) -> tuple:
+    """Parse one tag string into a tuple of (key, value) pairs.
+
+    The tuple is hashable and immutable, so identical tag strings — common
+    across dataset rows — are parsed once and served from the cache after
+    that. Returns () when the string is not a dict literal.
+    """
+    # Fast path: tags written by generate_dataset.py are plain JSON, which a
+    # C decoder handles in a fraction of the time ast.literal_eval takes.
+    # Python-repr dicts (single quotes) fall through to ast below.
+    loads = orjson.loads if orjson is not None else json.loads
+    try:
+        parsed = loads(raw)
+        if isinstance(parsed, dict):
+            return tuple(parsed.items())
+    except Exception:
+        pass
+    try:
+        parsed = ast.literal_eval(raw)
+        if isinstance(parsed, dict):
+            return tuple(parsed.items())
+    except Exception:
+        pass
+    return ()
+
 
 def safe_parse_tags(raw: Any) -> Dict:
     """Parse tags from various formats to dict.
-    
+
     Args:
         raw: Can be dict, string representation of dict, or other types.
-        
+
     Returns:
         Dictionary of tags, empty dict if parsing fails.
     """
@@ -16,7 +50,5 @@ def safe_parse_tags(raw: Any) -> Dict:
         return raw
     if not isinstance(raw, str):
         return {}
-    try:
-        return ast.literal_eval(raw)
-    except Exception:
-        return {}
+    # Fresh dict per call: callers may mutate it without poisoning the cache.
+    return dict(_parse_tag_items(raw))
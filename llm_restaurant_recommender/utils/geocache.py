@@ -0,0 +1,65 @@
+"""Persistent geocoding cache shared by the app and the dataset scripts.
+
+Two layers:
+- an in-process dict for instant repeat lookups within a run,
+- a shelve file under LOGS_DIR so results survive restarts.
+
+Entries are keyed by the normalized place string and expire after
+config.LOCATION_CACHE_TTL seconds.
+"""
+import shelve
+import time
+from threading import Lock
+from typing import Optional, Tuple
+
+import config
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_CACHE_PATH = str(config.LOGS_DIR / "geocode_cache")
+_LOCK = Lock()
+_MEM: dict = {}
+
+
+def normalize_place(place: str) -> str:
+    """Normalize a place string so equivalent queries share a cache entry."""
+    return str(place).strip().lower()
+
+
+def _is_fresh(entry) -> bool:
+    return bool(entry) and (time.time() - entry[2]) <= config.LOCATION_CACHE_TTL
+
+
+def lookup(place: str) -> Optional[Tuple[float, float]]:
+    """Return cached (lat, lon) for a place, or None on miss/expiry."""
+    key = normalize_place(place)
+    entry = _MEM.get(key)
+    if entry is None:
+        with _LOCK:
+            try:
+                with shelve.open(_CACHE_PATH) as db:
+                    entry = db.get(key)
+            except Exception as e:  # cache corrupta o sin permisos: seguir sin caché
+                logger.debug(f"Geocode cache read failed: {e}")
+                return None
+        if entry is not None:
+            _MEM[key] = entry
+    if _is_fresh(entry):
+        logger.debug(f"Geocode cache hit: {key}")
+        return entry[0], entry[1]
+    return None
+
+
+def store(place: str, lat: float, lon: float) -> None:
+    """Persist a geocoding result for future lookups."""
+    key = normalize_place(place)
+    entry = (float(lat), float(lon), time.time())
+    _MEM[key] = entry
+    with _LOCK:
+        try:
+            with shelve.open(_CACHE_PATH) as db:
+                db[key] = entry
+        except Exception as e:
+            logger.debug(f"Geocode cache write failed: {e}")
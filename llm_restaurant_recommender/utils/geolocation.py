@@ -1,24 +1,59 @@
-import time
-from pathlib import Path
+from functools import lru_cache
 from typing import Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import requests
 from geopy.geocoders import Nominatim
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from . import geocache
 from .common import safe_parse_tags
 from .logger import get_logger
-from .ranking import PRICE_SYMBOLS, haversine_meters
+from .ranking import PRICE_SYMBOLS, _price_buckets, haversine_meters_vec
 from .rate_limiter import wait_for_nominatim, wait_for_overpass
 import config
 
 logger = get_logger(__name__)
 
+try:  # optional: multithreaded C CSV parser for the local dataset load
+    import pyarrow  # noqa: F401
+
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    _CSV_ENGINE = "c"
+
+try:  # optional: spatial index for the local dataset radius filter
+    from sklearn.neighbors import BallTree
+except ImportError:
+    BallTree = None
+
+try:  # optional: C JSON parser for large Overpass responses
+    import orjson
+except ImportError:
+    orjson = None
+
+_EARTH_RADIUS_M = 6371000.0
+
 OVERPASS_URL = config.OVERPASS_URL
 
+# Persistent session: reuses the TCP/TLS connection across queries (Overpass
+# serializes per IP, so pooling rather than parallelism is the right lever)
+# and urllib3.Retry replaces the hand-rolled retry/backoff loop.
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=1.5, status_forcelist=[429, 502, 503, 504],
+                      allowed_methods=["POST"]),
+)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+
 _geolocator = Nominatim(user_agent="llm_restaurant_recommender")
 
-LOCAL_DATASET_PATH = Path(__file__).resolve().parents[1] / "data" / "restaurants_yelp.csv"
+LOCAL_DATASET_PATH = config.LOCAL_DATASET_CSV
 
 
 def resolve_location(place_or_coords: Union[str, Tuple[float, float]]) -> Optional[Tuple[float, float]]:
@@ -47,11 +82,16 @@ def resolve_location(place_or_coords: Union[str, Tuple[float, float]]) -> Option
 
     # Treat as string place name
     try:
+        cached = geocache.lookup(place_or_coords)
+        if cached is not None:
+            logger.debug(f"Geocode cache hit for '{place_or_coords}'")
+            return cached
         logger.info(f"Geocoding location: {place_or_coords}")
         wait_for_nominatim()  # Respect rate limits
         loc = _geolocator.geocode(str(place_or_coords), timeout=10)
         if loc:
             logger.info(f"Geocoded '{place_or_coords}' to ({loc.latitude}, {loc.longitude})")
+            geocache.store(place_or_coords, loc.latitude, loc.longitude)
             return float(loc.latitude), float(loc.longitude)
         logger.warning(f"Could not geocode location: {place_or_coords}")
     except Exception as e:
@@ -60,65 +100,124 @@ def resolve_location(place_or_coords: Union[str, Tuple[float, float]]) -> Option
     return None
 
 
+_ADDR_KEYS = ("addr:street", "addr:housenumber", "addr:postcode", "addr:city", "addr:neighbourhood")
+
+# Tags worth keeping per result row; everything else (OSM elements can carry
+# dozens of keys) would just be dead weight retained by the DataFrame. The
+# price keys feed ranking's bucket inference, the rest feed explanations.
+_KEEP_TAGS = frozenset({
+    "phone", "website", "diet:vegan", "diet:vegetarian",
+    "cuisine", "opening_hours", "price", "price:class", "cost",
+})
+
+
 def _build_address_from_tags(tags: dict) -> str:
-    parts = []
     if not tags:
         return ""
-    for key in ["addr:street", "addr:housenumber", "addr:postcode", "addr:city", "addr:neighbourhood"]:
-        v = tags.get(key)
-        if v:
-            parts.append(str(v))
-    return ", ".join(parts)
+    return ", ".join(str(v) for k in _ADDR_KEYS if (v := tags.get(k)))
+
+
+# Unified symbol/word -> bucket map, built once: $-symbols and the
+# Spanish/English labels share a single case-insensitive lookup instead of a
+# branch plus a dict literal allocated per call.
+_PRICE_MAP = {
+    **PRICE_SYMBOLS,
+    "low": "low",
+    "medio": "medium",
+    "media": "medium",
+    "medium": "medium",
+    "moderado": "medium",
+    "moderada": "medium",
+    "high": "high",
+    "alto": "high",
+    "alta": "high",
+    "bajo": "low",
+    "baja": "low",
+}
 
 
 def _normalize_price_label(value: Optional[str]) -> str:
     if not value:
         return ""
-    value = str(value).strip()
-    if value in PRICE_SYMBOLS:
-        return PRICE_SYMBOLS[value]
-    lowered = value.lower()
-    return {
-        "low": "low",
-        "medio": "medium",
-        "media": "medium",
-        "medium": "medium",
-        "moderado": "medium",
-        "moderada": "medium",
-        "high": "high",
-        "alto": "high",
-        "alta": "high",
-        "bajo": "low",
-        "baja": "low",
-    }.get(lowered, "")
+    return _PRICE_MAP.get(str(value).strip().lower(), "")
 
 
 def _load_local_dataset() -> pd.DataFrame:
+    """Load the local dataset, cached across calls until the CSV changes."""
+    if not LOCAL_DATASET_PATH.exists():
+        return pd.DataFrame()
+    try:
+        mtime_ns = LOCAL_DATASET_PATH.stat().st_mtime_ns
+    except OSError:
+        return pd.DataFrame()
+    # copy() so callers adding columns (distance_m, etc.) don't poison the cache
+    return _load_local_dataset_cached(mtime_ns)[0].copy()
+
+
+def _local_candidates(center: Tuple[float, float], radius: int) -> pd.DataFrame:
+    """Local-dataset rows within radius meters of center.
+
+    Uses the BallTree built alongside the cached dataset when scikit-learn is
+    available (O(log N) per query instead of scanning every row), falling back
+    to the vectorized linear filter otherwise.
+    """
     if not LOCAL_DATASET_PATH.exists():
         return pd.DataFrame()
     try:
-        df = pd.read_csv(LOCAL_DATASET_PATH)
+        mtime_ns = LOCAL_DATASET_PATH.stat().st_mtime_ns
+    except OSError:
+        return pd.DataFrame()
+    df, tree = _load_local_dataset_cached(mtime_ns)
+    if df.empty:
+        return df.copy()
+    lat, lon = center
+    if tree is not None:
+        idx = tree.query_radius(np.radians([[lat, lon]]), r=radius / _EARTH_RADIUS_M)[0]
+        sub = df.iloc[idx].copy()
+        # exact distances only for the rows the tree returned
+        sub["distance_m"] = haversine_meters_vec(lat, lon, sub["lat"].to_numpy(), sub["lon"].to_numpy())
+        return sub.reset_index(drop=True)
+    return _filter_within_radius(df.copy(), center, radius)
+
+
+@lru_cache(maxsize=2)
+def _load_local_dataset_cached(mtime_ns: int):
+    # keyed on the file's mtime: a rewritten CSV invalidates the cache, and
+    # repeat queries skip the read + per-row tags parsing entirely
+    try:
+        df = pd.read_csv(LOCAL_DATASET_PATH, engine=_CSV_ENGINE)
         logger.debug(f"Loaded {len(df)} restaurants from local dataset")
     except Exception as e:
         logger.error(f"Failed to load local dataset: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
 
     if df.empty or "lat" not in df.columns or "lon" not in df.columns:
-        return pd.DataFrame()
+        return pd.DataFrame(), None
+
+    # coerce coordinates once here (rows without them are useless downstream)
+    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
+    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+    df = df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
 
     if "cuisine" not in df.columns:
         df["cuisine"] = ""
 
     if "tags" in df.columns:
-        parsed = df["tags"].apply(safe_parse_tags)
+        parsed = df["tags"].map(safe_parse_tags)
         df["tags"] = parsed
+
+        # one traversal of the parsed tags extracts the raw prices; the label
+        # normalization then runs as vectorized string ops plus a C-level
+        # dict lookup (Series.map) instead of a Python call per row
+        prices = parsed.map(lambda t: t.get("price") if isinstance(t, dict) else None)
+        price_labels = prices.str.strip().str.lower().map(_PRICE_MAP).fillna("")
         if "price" not in df.columns:
-            df["price"] = parsed.apply(lambda t: t.get("price") if isinstance(t, dict) else None)
+            df["price"] = prices
         if "price_range" not in df.columns:
-            df["price_range"] = parsed.apply(lambda t: _normalize_price_label(t.get("price")) if isinstance(t, dict) else "")
+            df["price_range"] = price_labels
         else:
             mask = df["price_range"].isna() | (df["price_range"].astype(str).str.strip() == "")
-            df.loc[mask, "price_range"] = parsed[mask].apply(lambda t: _normalize_price_label(t.get("price")) if isinstance(t, dict) else "")
+            df.loc[mask, "price_range"] = price_labels[mask]
     else:
         df["tags"] = [{}] * len(df)
 
@@ -126,19 +225,37 @@ def _load_local_dataset() -> pd.DataFrame:
         df["price_range"] = df.get("price", "").apply(_normalize_price_label)
 
     df["source"] = "local_dataset"
-    return df
+
+    # Derived ranking column staged once per CSV version: repeat queries over
+    # the local dataset reuse it instead of re-running the bucket inference
+    # (tag parsing included) on every ranking pass.
+    df["price_bucket"] = _price_buckets(df)
+
+    tree = None
+    if BallTree is not None and len(df):
+        # built once per CSV version; query_radius takes radians and a radius
+        # expressed in Earth radii
+        tree = BallTree(np.radians(df[["lat", "lon"]].to_numpy(dtype=float)), metric="haversine")
+    return df, tree
 
 
 def _filter_within_radius(df: pd.DataFrame, center: Tuple[float, float], radius: int) -> pd.DataFrame:
     if df.empty:
         return df
     lat, lon = center
-    df = df.copy()
-    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-    df = df.dropna(subset=["lat", "lon"])
-    df["distance_m"] = df.apply(lambda row: haversine_meters(lat, lon, float(row["lat"]), float(row["lon"])), axis=1)
-    return df[df["distance_m"] <= radius].reset_index(drop=True)
+    # Work on plain arrays and copy only the rows that survive the filter:
+    # no intermediate full-frame copy for rows that get discarded anyway.
+    lat_arr = pd.to_numeric(df["lat"], errors="coerce").to_numpy(dtype=float)
+    lon_arr = pd.to_numeric(df["lon"], errors="coerce").to_numpy(dtype=float)
+    valid = ~(np.isnan(lat_arr) | np.isnan(lon_arr))
+    dist = np.full(lat_arr.shape, np.nan)
+    dist[valid] = haversine_meters_vec(lat, lon, lat_arr[valid], lon_arr[valid])
+    keep = dist <= radius  # NaN distances compare False, dropping rows without coords
+    result = df.loc[keep].copy()
+    result["lat"] = lat_arr[keep]
+    result["lon"] = lon_arr[keep]
+    result["distance_m"] = dist[keep]
+    return result.reset_index(drop=True)
 
 
 def search_restaurants(place_or_coords: Union[str, Tuple[float, float]], cuisine: Optional[str] = None, radius: int = 1500, timeout: int = 25, retries: int = 2) -> pd.DataFrame:
@@ -149,7 +266,8 @@ def search_restaurants(place_or_coords: Union[str, Tuple[float, float]], cuisine
         cuisine: optional cuisine type (e.g., 'italiano'). If None, searches for generic restaurants.
         radius: search radius in meters.
         timeout: Overpass timeout in seconds.
-        retries: number of retries on HTTP/network errors.
+        retries: kept for backward compatibility; HTTP retries/backoff are
+            handled by the shared session's Retry policy.
 
     Returns:
         pandas.DataFrame with columns: name, cuisine, lat, lon, address, opening_hours
@@ -166,45 +284,34 @@ def search_restaurants(place_or_coords: Union[str, Tuple[float, float]], cuisine
     if cuisine:
         cuisine_filter = f'["cuisine"~"{cuisine}",i]'
 
-    # Overpass QL
+    # Overpass QL: nwr evaluates the around filter once for nodes, ways and
+    # relations instead of three times
     query = f"""
 [out:json][timeout:{timeout}];
-(
-  node["amenity"="restaurant"]{cuisine_filter}(around:{radius},{lat},{lon});
-  way["amenity"="restaurant"]{cuisine_filter}(around:{radius},{lat},{lon});
-  relation["amenity"="restaurant"]{cuisine_filter}(around:{radius},{lat},{lon});
-);
+nwr["amenity"="restaurant"]{cuisine_filter}(around:{radius},{lat},{lon});
 out center;
 """.strip()
 
-    attempt = 0
     logger.info(f"Querying Overpass API (radius={radius}m, cuisine={cuisine or 'any'})")
-    while attempt <= retries:
-        try:
-            wait_for_overpass()  # Respect rate limits
-            resp = requests.post(OVERPASS_URL, data={"data": query}, timeout=timeout + 5)
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info(f"Overpass API request successful on attempt {attempt + 1}")
-            break
-        except Exception as e:
-            attempt += 1
-            logger.warning(f"Overpass request failed (attempt {attempt}/{retries + 1}): {e}")
-            if attempt > retries:
-                logger.error("Overpass API request failed after all retries")
-                data = None
-                break
-            time.sleep(1 + attempt * 1.5)
-
-    rows = []
+    try:
+        wait_for_overpass()  # Respect rate limits
+        resp = _SESSION.post(OVERPASS_URL, data={"data": query}, timeout=timeout + 5)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content) if orjson is not None else resp.json()
+        logger.info("Overpass API request successful")
+    except Exception as e:
+        logger.error(f"Overpass API request failed after retries: {e}")
+        data = None
+
+    # Construcción columnar (struct-of-arrays): listas por columna en lugar de
+    # un dict por elemento, así pandas recibe columnas ya tipadas y se evita
+    # la inferencia de dtypes sobre una lista de dicts.
+    names, cuisines, lats, lons, addresses, openings, prices, price_ranges, tags_list = ([] for _ in range(9))
     if data:
         elements = data.get("elements", [])
         logger.debug(f"Received {len(elements)} elements from Overpass")
         for el in elements:
             tags = el.get("tags", {}) or {}
-            name = tags.get("name") or tags.get("operator") or ""
-            cuisine_tag = tags.get("cuisine", "")
-            opening = tags.get("opening_hours") or ""
 
             if el.get("type") == "node":
                 rlat = el.get("lat")
@@ -217,30 +324,38 @@ out center;
             if rlat is None or rlon is None:
                 continue
 
-            address = _build_address_from_tags(tags)
             price = tags.get("price") or tags.get("price:class")
-            price_range = _normalize_price_label(price)
-
-            rows.append({
-                "name": name,
-                "cuisine": cuisine_tag,
-                "lat": float(rlat),
-                "lon": float(rlon),
-                "address": address,
-                "opening_hours": opening,
-                "price": price,
-                "price_range": price_range,
-                "tags": tags,
-                "source": "overpass",
-            })
-
-    df_overpass = pd.DataFrame(rows)
-
-    local_df = _load_local_dataset()
-    if cuisine:
-        cuisine_lower = cuisine.lower()
-        local_df = local_df[local_df["cuisine"].fillna("").str.lower().str.contains(cuisine_lower, na=False)] if not local_df.empty else local_df
-    local_df = _filter_within_radius(local_df, coords, radius) if not local_df.empty else local_df
+            names.append(tags.get("name") or tags.get("operator") or "")
+            cuisines.append(tags.get("cuisine", ""))
+            lats.append(float(rlat))
+            lons.append(float(rlon))
+            addresses.append(_build_address_from_tags(tags))
+            openings.append(tags.get("opening_hours") or "")
+            prices.append(price)
+            price_ranges.append(_normalize_price_label(price))
+            tags_list.append({k: tags[k] for k in _KEEP_TAGS if k in tags})
+
+    if names:
+        df_overpass = pd.DataFrame({
+            "name": names,
+            "cuisine": cuisines,
+            "lat": np.asarray(lats, dtype=np.float64),
+            "lon": np.asarray(lons, dtype=np.float64),
+            "address": addresses,
+            "opening_hours": openings,
+            "price": prices,
+            "price_range": price_ranges,
+            "tags": tags_list,
+            "source": "overpass",
+        })
+    else:
+        df_overpass = pd.DataFrame()
+
+    # radius first (spatial index when available), then the cuisine filter
+    # over the much smaller candidate set
+    local_df = _local_candidates(coords, radius)
+    if cuisine and not local_df.empty:
+        local_df = local_df[local_df["cuisine"].fillna("").str.lower().str.contains(cuisine.lower(), na=False)]
 
     if df_overpass.empty and local_df.empty:
         return pd.DataFrame(columns=["name", "cuisine", "lat", "lon", "address", "opening_hours", "price", "price_range", "tags", "source", "distance_m"])
@@ -11,38 +11,39 @@ LOGS_DIR.mkdir(exist_ok=True)
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Shared handlers, built once at import: every module logger reuses these
+# exact instances, so the process keeps one fd on app.log instead of one per
+# module (handlers are thread-safe and re-entrant across loggers).
+_FORMATTER = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+
+_CONSOLE_HANDLER = logging.StreamHandler(sys.stdout)
+_CONSOLE_HANDLER.setLevel(logging.INFO)
+_CONSOLE_HANDLER.setFormatter(_FORMATTER)
+
+# delay=True: the fd opens on the first record, not at import
+_FILE_HANDLER = logging.FileHandler(LOGS_DIR / "app.log", encoding="utf-8", delay=True)
+_FILE_HANDLER.setLevel(logging.DEBUG)  # File gets all debug info
+_FILE_HANDLER.setFormatter(_FORMATTER)
+
 
 def get_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     """Get a configured logger instance.
-    
+
     Args:
         name: Name of the logger (usually __name__)
         level: Logging level (default: INFO)
-        
+
     Returns:
         Configured logger instance
     """
     logger = logging.getLogger(name)
-    
+
     # Avoid adding handlers multiple times
     if logger.handlers:
         return logger
-    
+
     logger.setLevel(level)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler
-    log_file = LOGS_DIR / "app.log"
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
-    file_handler.setLevel(logging.DEBUG)  # File gets all debug info
-    file_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-    
+    logger.addHandler(_CONSOLE_HANDLER)
+    logger.addHandler(_FILE_HANDLER)
+
     return logger
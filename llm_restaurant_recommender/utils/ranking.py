@@ -1,10 +1,22 @@
 import math
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .common import safe_parse_tags
-from config import PRICE_SYMBOLS as CONFIG_PRICE_SYMBOLS, RANKING_WEIGHTS
+from config import MAX_RANKING_DISTANCE_M, PRICE_SYMBOLS as CONFIG_PRICE_SYMBOLS, RANKING_WEIGHTS
+
+try:  # numba es opcional: sin ella se usa la ruta numpy vectorizada
+    from numba import njit, prange
+
+    _NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    _NUMBA_AVAILABLE = False
+
+
+# Earth diameter in meters, folded once instead of 2 * R per call
+_EARTH_DIAMETER_M = 2.0 * 6371000.0
 
 
 def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -14,58 +26,115 @@ def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> floa
     dlon = lon2 - lon1
     dlat = lat2 - lat1
     a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    c = 2 * math.asin(math.sqrt(a))
-    R = 6371000  # Radius of earth in meters
-    return R * c
+    return _EARTH_DIAMETER_M * math.asin(math.sqrt(a))
+
+
+if _NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_kernel(lat1: float, lon1: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        out = np.empty(lats.size, lats.dtype)
+        for i in prange(lats.size):
+            dlat = lats[i] - lat1
+            dlon = lons[i] - lon1
+            a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lats[i]) * math.sin(dlon / 2) ** 2
+            out[i] = 6371000.0 * 2.0 * math.asin(math.sqrt(a))
+        return out
+
+
+def haversine_meters_vec(lat1: float, lon1: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Vectorized haversine: distances (meters) from one point to arrays of points.
+
+    With numba installed the loop runs as compiled parallel code; otherwise
+    the same math is evaluated with numpy ufuncs.
+    """
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    # conservar float32 si llega float32 (mitad de ancho de banda); solo se
+    # promueve a float64 lo que no sea ya punto flotante
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    if not np.issubdtype(lats.dtype, np.floating):
+        lats = lats.astype(np.float64)
+    if not np.issubdtype(lons.dtype, np.floating):
+        lons = lons.astype(np.float64)
+    lats = np.radians(lats)
+    lons = np.radians(lons)
+    if _NUMBA_AVAILABLE:
+        return _haversine_kernel(lat1, lon1, lats, lons)
+    cos_lat1 = math.cos(lat1)  # fixed reference latitude: evaluate once
+    dlat = lats - lat1
+    dlon = lons - lon1
+    a = np.sin(dlat / 2) ** 2 + cos_lat1 * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return _EARTH_DIAMETER_M * np.arcsin(np.sqrt(a))
+
+
+def warm_up_kernels() -> None:
+    """Trigger numba JIT compilation ahead of the first user query (no-op without numba)."""
+    if _NUMBA_AVAILABLE:
+        haversine_meters_vec(0.0, 0.0, np.zeros(1), np.zeros(1))
 
 
 PRICE_SYMBOLS = CONFIG_PRICE_SYMBOLS
 
 
-def _infer_price_bucket(row: pd.Series) -> str:
-    price = row.get("price_range")
-    if isinstance(price, str) and price.strip():
-        normalized = price.strip().lower()
-        if normalized in {"low", "medio", "medium", "high", "alto", "bajo"}:
-            return {"medio": "medium", "alto": "high", "bajo": "low"}.get(normalized, normalized)
-
-    symbolic_price = row.get("price")
-    if isinstance(symbolic_price, str) and symbolic_price.strip():
-        cleaned = symbolic_price.strip()
-        if cleaned in PRICE_SYMBOLS:
-            return PRICE_SYMBOLS[cleaned]
-        lowered = cleaned.lower()
-        if lowered in {"low", "medium", "high"}:
-            return lowered
-
-    numeric_price = row.get("average_price") or row.get("avg_price")
-    if numeric_price is not None:
-        try:
-            value = float(numeric_price)
-            if value < 30000:
-                return "low"
-            if value < 60000:
-                return "medium"
-            return "high"
-        except Exception:
-            pass
-
-    tags = safe_parse_tags(row.get("tags"))
+_PRICE_WORD_MAP = {"low": "low", "medio": "medium", "medium": "medium", "high": "high", "alto": "high", "bajo": "low"}
+
+
+def _bucket_from_tags(raw) -> Optional[str]:
+    tags = safe_parse_tags(raw)
     if tags:
         tag_price = tags.get("price") or tags.get("price:class") or tags.get("cost")
-        if tag_price:
-            if isinstance(tag_price, str):
-                tag_price = tag_price.strip()
-                if tag_price in PRICE_SYMBOLS:
-                    return PRICE_SYMBOLS[tag_price]
-                lowered = tag_price.lower()
-                if lowered in {"low", "medium", "high"}:
-                    return lowered
+        if isinstance(tag_price, str):
+            tag_price = tag_price.strip()
+            if tag_price in PRICE_SYMBOLS:
+                return PRICE_SYMBOLS[tag_price]
+            lowered = tag_price.lower()
+            if lowered in {"low", "medium", "high"}:
+                return lowered
+    return None
+
 
-    return "unknown"
+def _price_buckets(df: pd.DataFrame) -> pd.Series:
+    """Infer the price bucket per row with column-wise operations.
 
+    Mirrors the old per-row fallback chain (price_range label, symbolic
+    price, numeric average, tags) but each layer is a vectorized pandas pass;
+    only rows still unresolved after the cheap layers pay the tag parsing.
+    """
+    bucket = None
+    if "price_bucket" in df.columns:
+        # Values staged by the cached dataset loader take priority, but only
+        # where present: in mixed result sets (local rows concatenated with
+        # Overpass rows) the unstaged rows are NaN here and must still go
+        # through the inference layers below instead of landing on "unknown".
+        bucket = df["price_bucket"]
+        if not bucket.isna().any():
+            return bucket
+    if "price_range" in df.columns:
+        layer = df["price_range"].astype(str).str.strip().str.lower().map(_PRICE_WORD_MAP)
+        bucket = layer if bucket is None else bucket.combine_first(layer)
+    if "price" in df.columns:
+        p = df["price"].astype(str).str.strip()
+        layer = p.map(PRICE_SYMBOLS).combine_first(p.str.lower().map({"low": "low", "medium": "medium", "high": "high"}))
+        bucket = layer if bucket is None else bucket.combine_first(layer)
+    num = None
+    for col in ("average_price", "avg_price"):
+        if col in df.columns:
+            c = pd.to_numeric(df[col], errors="coerce")
+            num = c if num is None else num.fillna(c)
+    if num is not None:
+        layer = pd.cut(num, bins=[-np.inf, 30000, 60000, np.inf], labels=["low", "medium", "high"], right=False).astype(object)
+        bucket = layer if bucket is None else bucket.combine_first(layer)
+    if bucket is None:
+        bucket = pd.Series(np.nan, index=df.index, dtype=object)
+    if "tags" in df.columns:
+        unresolved = bucket.isna()
+        if unresolved.any():
+            bucket[unresolved] = df.loc[unresolved, "tags"].map(_bucket_from_tags)
+    return bucket.fillna("unknown")
 
-def rank_restaurants(df: pd.DataFrame, prefs: dict, user_coords: Optional[Tuple[float, float]] = None, weights: dict = None) -> pd.DataFrame:
+
+def rank_restaurants(df: pd.DataFrame, prefs: dict, user_coords: Optional[Tuple[float, float]] = None, weights: dict = None, top_k: Optional[int] = None, max_distance_m: Optional[float] = None) -> pd.DataFrame:
     """Score and sort restaurants combining distance (Haversine), cuisine match, price alignment and rating.
 
     Args:
@@ -73,6 +142,10 @@ def rank_restaurants(df: pd.DataFrame, prefs: dict, user_coords: Optional[Tuple[
         prefs: dict containing optional 'cuisine' and 'price_range' keys.
         user_coords: optional tuple (lat, lon). If provided, distance is computed with Haversine.
         weights: optional dict with keys 'distance', 'cuisine', 'price', 'rating'.
+        top_k: if given, return only the best top_k rows, selected in O(N)
+            with argpartition instead of sorting the whole frame.
+        max_distance_m: the caller's search radius in meters; rows within it
+            always get an exact distance, even past MAX_RANKING_DISTANCE_M.
 
     Returns:
         DataFrame sorted by 'score' descending and containing new columns 'distance_m' and 'score'.
@@ -93,59 +166,92 @@ def rank_restaurants(df: pd.DataFrame, prefs: dict, user_coords: Optional[Tuple[
     # Compute distance (meters) if user_coords provided
     if user_coords is not None:
         ulat, ulon = float(user_coords[0]), float(user_coords[1])
-        df["distance_m"] = df.apply(lambda row: haversine_meters(ulat, ulon, float(row["lat"]), float(row["lon"])), axis=1)
+        lats = df["lat"].to_numpy()
+        lons = df["lon"].to_numpy()
+        # Prefiltro por caja delimitadora: filas fuera de la caja puntúan 0 en
+        # distancia de todos modos, así que la trigonometría solo corre sobre
+        # las candidatas cercanas; el resto queda marcado con NaN (distancia
+        # desconocida). La caja nunca es menor que el radio pedido por el
+        # llamador, para que toda fila dentro de su búsqueda conserve su
+        # distancia real.
+        prune_m = max(MAX_RANKING_DISTANCE_M, float(max_distance_m or 0.0))
+        dlat_deg = prune_m / 111320.0
+        dlon_deg = prune_m / (111320.0 * max(abs(math.cos(math.radians(ulat))), 1e-6))
+        near = (np.abs(lats - ulat) < dlat_deg) & (np.abs(lons - ulon) < dlon_deg)
+        dist = np.full(len(df), np.nan)
+        if near.any():
+            dist[near] = haversine_meters_vec(ulat, ulon, lats[near], lons[near])
+        df["distance_m"] = dist
+
+    # Component scores live in numpy arrays and are combined in one fused
+    # expression below: a single assignment into the DataFrame instead of one
+    # full-column read/write per intermediate score.
 
-    # Normalize distance to a score in [0,1]: closer => higher. Use a simple linear decay up to max_dist.
-    # Determine max distance observed (or default to 5000 m)
+    # Distance score in [0,1]: closer => higher, linear decay up to max_dist.
+    # Rows with unknown distance (NaN, including prefiltered ones) score 0.
     df["distance_m"] = pd.to_numeric(df.get("distance_m"), errors="coerce")
-    max_dist = df["distance_m"].max(skipna=True)
+    dist = df["distance_m"].to_numpy(dtype=float)
+    finite = np.isfinite(dist)
+    max_dist = dist[finite].max() if finite.any() else np.nan
     if pd.isna(max_dist) or max_dist <= 0:
-        max_dist = 5000.0
-
-    # score_distance: 1.0 for distance 0, 0.0 for distance >= max_dist
-    df["score_distance"] = df["distance_m"].apply(lambda d: max(0.0, 1.0 - (d / max_dist)) if pd.notna(d) else 0.0)
+        max_dist = MAX_RANKING_DISTANCE_M
+    score_distance = np.where(finite, np.maximum(0.0, 1.0 - dist / max_dist), 0.0)
 
-    # Cuisine match score: 1 if matches preference (case-insensitive substring), else 0
+    # Cuisine match score: 1 if matches preference (case-insensitive substring), else 0.
+    # regex=False makes it a plain C substring scan and keeps preferences with
+    # regex metacharacters from being misinterpreted (or crashing the match).
     pref_cuisine = (prefs or {}).get("cuisine") or ""
     if pref_cuisine:
-        df["score_cuisine"] = df["cuisine"].fillna("").str.contains(pref_cuisine, case=False).astype(float)
+        score_cuisine = df["cuisine"].fillna("").str.contains(pref_cuisine, case=False, regex=False).to_numpy(dtype=float)
     else:
-        df["score_cuisine"] = 0.0
+        score_cuisine = 0.0
 
-    # Price alignment score: encourage matches with preferred range
+    # Price alignment score: encourage matches with preferred range. The
+    # row-wise bucket inference (the expensive part) only runs when the user
+    # actually stated a price preference; without one it contributes 0 anyway.
     pref_price = (prefs or {}).get("price_range", "any")
-    df["price_bucket"] = df.apply(_infer_price_bucket, axis=1)
     if pref_price and pref_price.lower() not in {"any", ""}:
         pref_price = pref_price.lower().strip()
         pref_price = {"medio": "medium", "media": "medium", "moderado": "medium", "moderada": "medium", "alto": "high", "alta": "high", "bajo": "low", "baja": "low"}.get(pref_price, pref_price)
 
-        def _score_price(bucket: str) -> float:
-            if bucket == pref_price:
-                return 1.0
-            if bucket in {"unknown", ""}:
-                return 0.2
-            if {bucket, pref_price} == {"low", "medium"} or {bucket, pref_price} == {"medium", "high"}:
-                return 0.5
-            return 0.0
-
-        df["score_price"] = df["price_bucket"].apply(_score_price)
+        buckets = _price_buckets(df)
+        df["price_bucket"] = buckets
+        adjacent = {"low": ["medium"], "medium": ["low", "high"], "high": ["medium"]}.get(pref_price, [])
+        score_price = np.select(
+            [buckets == pref_price, buckets.isin(["unknown", ""]), buckets.isin(adjacent)],
+            [1.0, 0.2, 0.5],
+            default=0.0,
+        )
     else:
-        df["score_price"] = 0.0
+        score_price = 0.0
 
     # Rating score: normalize rating column (assume 0-5 scale). If no rating, 0.
     if "rating" in df.columns:
-        df["rating_norm"] = pd.to_numeric(df["rating"], errors="coerce").fillna(0.0) / 5.0
+        rating_norm = pd.to_numeric(df["rating"], errors="coerce").fillna(0.0).to_numpy() / 5.0
     else:
-        df["rating_norm"] = 0.0
-
-    # Combine weighted score
-    df["score"] = (
-        weights.get("distance", 0.0) * df["score_distance"]
-        + weights.get("cuisine", 0.0) * df["score_cuisine"]
-        + weights.get("price", 0.0) * df["score_price"]
-        + weights.get("rating", 0.0) * df["rating_norm"]
+        rating_norm = 0.0
+
+    # Combine the weighted score as one (N,4) float32 matvec: a single BLAS
+    # pass instead of one scaled-add temporary per component, at half the
+    # memory traffic of float64 (scores live in [0,1], so float32 is plenty)
+    components = np.empty((len(df), 4), dtype=np.float32)
+    components[:, 0] = score_distance
+    components[:, 1] = score_cuisine
+    components[:, 2] = score_price
+    components[:, 3] = rating_norm
+    w = np.array(
+        [weights.get(k, 0.0) for k in ("distance", "cuisine", "price", "rating")],
+        dtype=np.float32,
     )
+    scores = components @ w
+    df["score"] = scores
 
     # Small tie-breaker: prefer nearer restaurants when scores equal
+    if top_k is not None and 0 < top_k < len(df):
+        # O(N) selection of the top_k candidates, then an O(K log K) sort of
+        # just those rows (lexsort keys go least-significant first).
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        idx = idx[np.lexsort((dist[idx], -scores[idx]))]
+        return df.iloc[idx].reset_index(drop=True)
     df = df.sort_values(by=["score", "distance_m"], ascending=[False, True]).reset_index(drop=True)
     return df
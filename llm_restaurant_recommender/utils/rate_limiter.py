@@ -20,8 +20,9 @@ class RateLimiter:
     
     def __init__(self):
         self._last_call: Dict[str, float] = defaultdict(float)
-        self._lock = Lock()
-        
+        # One lock per service: waiting on Overpass must not block Nominatim.
+        self._locks: Dict[str, Lock] = defaultdict(Lock)
+
         # Minimum seconds between calls
         rl = getattr(config, "RATE_LIMITS", {}) or {}
         self._limits = {
@@ -36,18 +37,19 @@ class RateLimiter:
         Args:
             service: Name of the service (nominatim, overpass, default)
         """
-        with self._lock:
-            now = time.time()
-            last = self._last_call.get(service, 0.0)
-            min_interval = self._limits.get(service, self._limits["default"])
-            
-            elapsed = now - last
-            if elapsed < min_interval:
-                wait_time = min_interval - elapsed
-                logger.debug(f"Rate limiting {service}: waiting {wait_time:.2f}s")
-                time.sleep(wait_time)
-            
-            self._last_call[service] = time.time()
+        min_interval = self._limits.get(service, self._limits["default"])
+        # Reserve the next slot under the service's lock, then sleep outside
+        # it: the lock is held for microseconds of bookkeeping, never for the
+        # sleep itself, so concurrent callers queue up on slots instead of on
+        # each other's sleeps. monotonic() is immune to wall-clock jumps.
+        with self._locks[service]:
+            now = time.monotonic()
+            slot = max(now, self._last_call[service] + min_interval)
+            self._last_call[service] = slot
+        wait_time = slot - now
+        if wait_time > 0:
+            logger.debug(f"Rate limiting {service}: waiting {wait_time:.2f}s")
+            time.sleep(wait_time)
 
 
 # Global rate limiter instance